@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'contacts.middleware.InstrumentationMiddleware',
+    'contacts.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,17 +84,89 @@ WSGI_APPLICATION = 'contact_manager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are configured through DB_* environment variables, see the
+# README. By default each worker keeps its connection open for DB_CONN_MAX_AGE
+# seconds and checks it is still usable before reusing it; DB_POOL=1 uses a
+# psycopg connection pool instead (needs psycopg[pool]).
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'contact_manager',
-        'USER': 'contact_manager',
-        'PASSWORD': 'contact_manager',
-        'HOST': '127.0.0.1',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'contact_manager'),
+        'USER': os.environ.get('DB_USER', 'contact_manager'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'contact_manager'),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+if os.environ.get('DB_POOL') == '1':
+    # The pool owns connection lifetimes, so Django must not keep them itself.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+# DB_REPLICA_HOSTS=host1,host2 adds read replicas of the default database.
+# Contact listings and searches read from them through ReplicaRouter.
+CONTACTS_READ_REPLICAS = []
+for i, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{i}'
+    host, _, port = host.strip().partition(':')
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    CONTACTS_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['contacts.routers.ReplicaRouter']
+
+# DB_ENGINE=sqlite runs against a local SQLite file instead, e.g. for benchmarks
+# or development without a PostgreSQL server.
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    CONTACTS_READ_REPLICAS = []
+    # SQLite ignores the non-key columns of covering indexes, which is harmless.
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Set REDIS_URL to share cached responses and version stamps between workers.
+# Cached responses and name indexes are only reused across requests when
+# CONTACTS_SHARED_CACHE is set: a LocMemCache is private to one process, so
+# other workers would never see a write invalidate them.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+    CONTACTS_SHARED_CACHE = True
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'contact-manager',
+        }
+    }
+    CONTACTS_SHARED_CACHE = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -112,6 +187,23 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+# The first hasher hashes new passwords; older hashes are upgraded on login.
+# Keep every Django default listed so hashes made with any of them still verify.
+# Set CONTACTS_PASSWORD_HASHER=argon2 (needs argon2-cffi) to prefer Argon2id.
+
+PASSWORD_HASHERS = [
+    'contacts.hashers.TunedPBKDF2PasswordHasher',
+    'contacts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if os.environ.get('CONTACTS_PASSWORD_HASHER') == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -129,6 +221,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files waiting for a background import job.
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -152,6 +247,79 @@ CSRF_TRUSTED_ORIGINS = [
 # DRF settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'contacts.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'contacts.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # The number of reverse proxies in front of the app. Client IPs (used by the
+    # login throttle) are read from that many X-Forwarded-For hops; with 0 the
+    # header is ignored, so clients cannot pick their own address.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Contacts
+CONTACTS_SEARCH_INDEX_SIZE = 128
+CONTACTS_FULLTEXT_SNIPPET_WIDTH = 160
+CONTACTS_IMPORT_BATCH_SIZE = 1000
+CONTACTS_IMPORT_MAX_ERRORS = 1000
+CONTACTS_BATCH_MAX_OPERATIONS = 500
+# Contacts removed per DELETE when an account is deleted.
+CONTACTS_DELETE_CHUNK_SIZE = 1000
+
+# Region assumed for phone numbers written without a country code.
+CONTACTS_PHONE_DEFAULT_REGION = 'US'
+
+# Deduplication: minimum pair score, and how many neighbours each contact is
+# compared with inside a blocking group.
+CONTACTS_DEDUP_THRESHOLD = 0.85
+CONTACTS_DEDUP_WINDOW = 20
+CONTACTS_EXPORT_CHUNK_SIZE = 2000
+CONTACTS_RESPONSE_CACHE_TIMEOUT = 300
+
+# Responses of at least this many bytes are compressed, with brotli (needs
+# the brotli package) or gzip as the client prefers.
+CONTACTS_COMPRESSION_MIN_SIZE = 1024
+CONTACTS_BROTLI_QUALITY = 5
+CONTACTS_TOKEN_CACHE_SIZE = 10000
+CONTACTS_TOKEN_CACHE_TTL = 60
+
+# Seconds an owner's reads stay on the primary after they changed a contact.
+CONTACTS_REPLICA_PIN_SECONDS = 5
+
+# Delta sync: changes per page, and how long tombstones of deleted contacts
+# are kept before purge_tombstones removes them.
+CONTACTS_SYNC_PAGE_SIZE = 500
+CONTACTS_SYNC_MAX_PAGE_SIZE = 2000
+CONTACTS_TOMBSTONE_RETENTION_DAYS = 30
+
+# Background jobs: worker processes per run_jobs command, how often it polls,
+# the first retry delay in seconds (doubled on every further attempt), and
+# after how many seconds without a heartbeat a running job is recovered.
+CONTACTS_JOB_PROCESSES = 2
+CONTACTS_JOB_POLL_INTERVAL = 1.0
+CONTACTS_JOB_RETRY_DELAY = 30
+CONTACTS_JOB_TIMEOUT = 600
+
+# Username and email availability checks.
+CONTACTS_AVAILABILITY_BATCH_SIZE = 100
+CONTACTS_AVAILABILITY_FILTER_CAPACITY = 100000
+CONTACTS_AVAILABILITY_FILTER_TTL = 300
+
+# Password hashing cost; unset uses Django's defaults.
+CONTACTS_PBKDF2_ITERATIONS = int(os.environ.get('CONTACTS_PBKDF2_ITERATIONS', 0)) or None
+CONTACTS_ARGON2_TIME_COST = int(os.environ.get('CONTACTS_ARGON2_TIME_COST', 0)) or None
+CONTACTS_ARGON2_MEMORY_COST = int(os.environ.get('CONTACTS_ARGON2_MEMORY_COST', 0)) or None
+
+# Token bucket login throttling per client IP and per username.
+CONTACTS_LOGIN_THROTTLE_RATES = {
+    'ip': '60/min',
+    'username': '10/min',
 }
+
+# Request instrumentation: Server-Timing headers and /metrics, plus a cProfile
+# dump of one request in CONTACTS_PROFILE_SAMPLE_RATE (0 disables profiling).
+CONTACTS_INSTRUMENTATION = os.environ.get('CONTACTS_INSTRUMENTATION') == '1'
+CONTACTS_PROFILE_SAMPLE_RATE = int(os.environ.get('CONTACTS_PROFILE_SAMPLE_RATE', 0))
+CONTACTS_PROFILE_DIR = BASE_DIR / 'profiles'
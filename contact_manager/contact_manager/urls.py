@@ -1,9 +1,11 @@
 
 from django.urls import include, path
+from contacts.instrumentation import metrics_view
 from contacts.views import UserLogin
 
 urlpatterns = [
     path('api/', include('contacts.urls')),
     path('api-auth/login/', UserLogin.as_view(), name='user-login'),
     path('api-auth/', include('rest_framework.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,230 @@
+import base64
+import copy
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework.authtoken.models import Token
+
+from contacts.authentication import token_cache
+from contacts.instrumentation import incr
+from contacts.models import Contact
+from contacts.pagination import keyset
+from contacts.search import search_contacts
+from contacts.serializers import ContactSerializer
+
+
+CONTACT_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'phone', 'notes']
+
+
+async def authenticate(request):
+    """
+    Resolve the user of a `Token <key>` Authorization header without blocking.
+
+    Shares the token cache of CachedTokenAuthentication, so a warm token costs
+    no query here either. Like it, returns a copy of the cached user.
+    """
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'token' or not key.strip():
+        return None
+    key = key.strip()
+    cached = token_cache.get(key)
+    if cached is not None:
+        incr('token_cache_hit')
+        return copy.copy(cached[0])
+    incr('token_cache_miss')
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+    token_cache.set(key, token.user, token)
+    return copy.copy(token.user)
+
+
+def token_required(view):
+    """
+    Reject requests without a valid token the way TokenAuthentication does.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            response = JsonResponse(
+                {'detail': 'Authentication credentials were not provided or are invalid.'},
+                status=401)
+            response['WWW-Authenticate'] = 'Token'
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def contact_row(owner, contact) -> dict:
+    """
+    Shape a contact, or a values() row of one, like ContactSerializer renders it.
+    """
+    if not isinstance(contact, dict):
+        contact = {column: getattr(contact, column) for column in CONTACT_COLUMNS}
+    return {'owner': owner.username, **{column: contact[column] for column in CONTACT_COLUMNS}}
+
+
+def encode_cursor(last_name, pk, reverse: bool = False) -> str:
+    position = [last_name, pk, 1] if reverse else [last_name, pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    Return the (last_name, id) position of a cursor and whether it pages back, or None.
+    """
+    try:
+        last_name, pk, *reverse = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if reverse not in ([], [1]):
+            return None
+        return (str(last_name), int(pk)), bool(reverse)
+    except (ValueError, TypeError):
+        return None
+
+
+def page_size(request, default: int, maximum: int) -> int:
+    try:
+        return max(1, min(int(request.GET.get('page_size', default)), maximum))
+    except ValueError:
+        return default
+
+
+def parse_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+@token_required
+async def contact_list(request):
+    """
+    List contacts in (last_name, id) keyset pages, or Create a new contact.
+
+    Pages link to the next and previous page like ContactCursorPagination does.
+    """
+    user = request.user
+    if request.method == 'POST':
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'detail': 'Expected a JSON object.'}, status=400)
+        serializer = ContactSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        contact = await Contact.objects.acreate(owner=user, **serializer.validated_data)
+        return JsonResponse(contact_row(user, contact), status=201)
+
+    size = page_size(request, 50, 500)
+    position, backwards = None, False
+    cursor = request.GET.get('cursor')
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return JsonResponse({'detail': 'Invalid cursor'}, status=404)
+        position, backwards = decoded
+    queryset = keyset(Contact.objects.filter(owner=user), position, reverse=backwards)
+
+    results = [contact_row(user, row) async for row in queryset.values(*CONTACT_COLUMNS)[:size + 1]]
+    more = len(results) > size
+    results = results[:size]
+    if backwards:
+        results.reverse()
+    # The rows a cursor points at are on the far side of the page it opens.
+    has_next = more if not backwards else position is not None
+    has_previous = more if backwards else position is not None
+
+    def link(row, back):
+        params = urlencode({'page_size': size, 'cursor': encode_cursor(row['last_name'], row['id'], back)})
+        return request.build_absolute_uri(f"{reverse('async-contact-list')}?{params}")
+
+    return JsonResponse({
+        'next': link(results[-1], False) if results and has_next else None,
+        'previous': link(results[0], True) if results and has_previous else None,
+        'results': results,
+    })
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+@token_required
+async def contact_detail(request, pk):
+    """
+    Read, Update, or Delete a contact.
+    """
+    user = request.user
+    try:
+        contact = await Contact.objects.filter(owner=user).aget(pk=pk)
+    except Contact.DoesNotExist:
+        return JsonResponse({'detail': 'No Contact matches the given query.'}, status=404)
+
+    if request.method == 'DELETE':
+        await contact.adelete()
+        return HttpResponse(status=204)
+
+    if request.method == 'PUT':
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'detail': 'Expected a JSON object.'}, status=400)
+        serializer = ContactSerializer(contact, data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        for name, value in serializer.validated_data.items():
+            setattr(contact, name, value)
+        await contact.asave()
+        return HttpResponse(status=204)
+
+    return JsonResponse(contact_row(user, contact))
+
+
+@csrf_exempt
+@require_http_methods(['GET'])
+@token_required
+async def contact_search(request):
+    """
+    Fuzzy search contacts by name, best matches first.
+    """
+    user = request.user
+    query = request.GET.get('q', '')
+    size = page_size(request, 25, 100)
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    start = (page - 1) * size
+
+    if connection.vendor == 'postgresql':
+        queryset = search_contacts(user.id, query)
+        count = await queryset.acount()
+        contacts = [contact async for contact in queryset[start:start + size]]
+    else:
+        # The in-process index is built with blocking queries.
+        def fetch():
+            ranked = search_contacts(user.id, query)
+            return len(ranked), ranked[start:start + size]
+        count, contacts = await sync_to_async(fetch)()
+
+    def page_url(number):
+        params = urlencode({'q': query, 'page': number, 'page_size': size})
+        return request.build_absolute_uri(f"{reverse('async-contact-search')}?{params}")
+
+    return JsonResponse({
+        'count': count,
+        'next': None if start + size >= count else page_url(page + 1),
+        'previous': None if page == 1 else page_url(page - 1),
+        'results': [contact_row(user, contact) for contact in contacts],
+    })
@@ -0,0 +1,82 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from contacts.instrumentation import incr
+
+
+class TokenCache:
+    """
+    Bounded, thread-safe LRU of token key -> (user, token) with a time to live.
+
+    Each process keeps its own entries; local deletes and user changes discard
+    them through signals, and the TTL bounds how long a change made by another
+    process can go unnoticed.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, user, token):
+        ttl = getattr(settings, 'CONTACTS_TOKEN_CACHE_TTL', 60)
+        max_size = getattr(settings, 'CONTACTS_TOKEN_CACHE_SIZE', 10000)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, (user, token))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            stale = [key for key, (_, (user, _)) in self._entries.items() if user.pk == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers recent token lookups.
+
+    Once a token has been seen, authenticating with it costs no queries until it
+    expires from the cache or is invalidated.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            incr('token_cache_miss')
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+        else:
+            incr('token_cache_hit')
+            user, token = cached
+        # Views may modify request.user, so never hand out the shared instance.
+        return copy.copy(user), token
@@ -0,0 +1,187 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from contacts.normalize import normalize_email
+
+
+class BloomFilter:
+    """
+    A fixed-size set that can answer "definitely absent" without storing its items.
+
+    Sized for capacity items at the given false positive rate; indexes are
+    derived from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for index in self._indexes(item):
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+
+class AvailabilityFilter:
+    """
+    Bloom filters of the taken usernames and (lowercased) emails.
+
+    Built on the first check, so booting a worker needs no database, and
+    rebuilt every CONTACTS_AVAILABILITY_FILTER_TTL seconds, so users created by other
+    processes are picked up; users saved in this process are added right away.
+    Deleted users stay in the filter until the next rebuild, which only costs
+    a query. Answers are advisory: registration itself still checks the
+    database.
+
+    Rebuilds scan auth_user without holding the lock: checks keep using the
+    current filters meanwhile, and the new ones are swapped in at the end.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usernames = None
+        self._emails = None
+        self._capacity = 0
+        self._count = 0
+        self._built = 0
+        self._refreshing = False
+        # Users saved while a rebuild scans the table, which its scan may miss.
+        self._added = []
+
+    def _build(self):
+        count = User.objects.count()
+        capacity = max(getattr(settings, 'CONTACTS_AVAILABILITY_FILTER_CAPACITY', 100000), count * 2)
+        usernames = BloomFilter(capacity)
+        emails = BloomFilter(capacity)
+        for username, email in User.objects.values_list('username', 'email').iterator(chunk_size=10000):
+            usernames.add(username)
+            if email:
+                emails.add(normalize_email(email))
+        return usernames, emails, capacity, count
+
+    def _stale(self):
+        ttl = getattr(settings, 'CONTACTS_AVAILABILITY_FILTER_TTL', 300)
+        return time.monotonic() - self._built > ttl or self._count > self._capacity
+
+    def refresh(self):
+        """
+        Rebuild the filters from the database and swap them in.
+
+        Only one rebuild runs at a time; a refresh asked for during another
+        returns right away.
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._added = []
+        try:
+            usernames, emails, capacity, count = self._build()
+        except BaseException:
+            with self._lock:
+                self._refreshing = False
+            raise
+        with self._lock:
+            for username, email in self._added:
+                usernames.add(username)
+                if email:
+                    emails.add(email)
+            count += len(self._added)
+            self._usernames, self._emails = usernames, emails
+            self._capacity, self._count = capacity, count
+            self._built = time.monotonic()
+            self._refreshing = False
+            self._added = []
+
+    def add(self, username: str, email: str):
+        email = normalize_email(email) if email else ''
+        with self._lock:
+            if self._refreshing:
+                self._added.append((username, email))
+            if self._usernames is None:
+                return
+            self._usernames.add(username)
+            if email:
+                self._emails.add(email)
+            self._count += 1
+
+    def clear(self):
+        with self._lock:
+            self._usernames = self._emails = None
+
+    def candidates(self, usernames, emails):
+        """
+        Split out the usernames and emails that might be taken; the rest are free.
+        """
+        with self._lock:
+            stale = self._usernames is None or self._stale()
+        if stale:
+            self.refresh()
+        with self._lock:
+            usernames_filter, emails_filter = self._usernames, self._emails
+        if usernames_filter is None:
+            # The first build is still running in another thread.
+            usernames_filter, emails_filter, _, _ = self._build()
+        return (
+            [username for username in usernames if username in usernames_filter],
+            [email for email in emails if normalize_email(email) in emails_filter],
+        )
+
+
+availability_filter = AvailabilityFilter()
+
+
+def taken_users(usernames=(), emails=(), exclude_pk=None):
+    """
+    Return the taken usernames and lowercased emails among those given, in one query.
+
+    Emails are compared case-insensitively, which the partial unique index on
+    LOWER(email) serves.
+    """
+    lowered = {normalize_email(email) for email in emails if email.strip()}
+    condition = Q()
+    if usernames:
+        condition |= Q(username__in=set(usernames))
+    if lowered:
+        condition |= Q(email_lower__in=lowered) & ~Q(email='')
+    if not condition:
+        return set(), set()
+    queryset = User.objects.annotate(email_lower=Lower('email')).filter(condition)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken_usernames, taken_emails = set(), set()
+    for username, email in queryset.values_list('username', 'email_lower'):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames & set(usernames), taken_emails & lowered
+
+
+def check_availability(usernames, emails) -> dict:
+    """
+    Map each username and email to whether it is still available.
+
+    The Bloom filter answers for most free names; only possible matches are
+    looked up, all together in a single query.
+    """
+    maybe_usernames, maybe_emails = availability_filter.candidates(usernames, emails)
+    taken_usernames, taken_emails = taken_users(maybe_usernames, maybe_emails)
+    return {
+        'usernames': {username: username not in taken_usernames for username in usernames},
+        'emails': {email: normalize_email(email) not in taken_emails for email in emails},
+    }
@@ -0,0 +1,242 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+from contacts.authentication import token_cache
+from contacts.compression import compress, supported_encodings
+from contacts.models import Contact, ContactStats, SyncState
+from contacts.pagination import ContactCursorPagination
+from contacts.renderers import COMPACT_RENDERERS, JSONRenderer as ContactsJSONRenderer, contact_rows, dumps_json
+from contacts.serializers import ContactSerializer
+
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+# The runs clear their cache between iterations, so they get one of their own:
+# the default cache may be a Redis shared with the live site.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'contacts-benchmark',
+    }
+}
+
+
+def seed(users: int, contacts_per_user: int, batch_size: int = 5000) -> list:
+    """
+    Create users with tokens and contacts as fast as the database allows.
+
+    Contacts are filled in like create_contact fills them in, but written with
+    bulk_create, and the password is hashed once for every user.
+
+    Return:
+        a list of (user, token key) tuples
+    """
+    password = make_password(BENCHMARK_PASSWORD)
+    created = []
+    for u in range(users):
+        user = User.objects.create(username=f'bench_user_{u}', password=password, email=f'bench{u}@test.com')
+        token = Token.objects.create(user=user)
+        batch = [
+            Contact(
+                owner=user,
+                first_name=f'First{i}',
+                last_name=f'Last{i % 997:03d}',
+                email=f'contact{i}@test.com' if i % 2 else '',
+                phone=f'555{i:07d}'[-10:] if i % 3 else '',
+                notes='Met at a conference. ' * (i % 5))
+            for i in range(contacts_per_user)
+        ]
+        for contact in batch:
+            contact.normalize_identifiers()
+        with transaction.atomic():
+            SyncState.objects.stamp(user.id, batch)
+            ContactStats.objects.record_contacts(user.id, batch)
+            Contact.objects.bulk_create(batch, batch_size=batch_size)
+        created.append((user, token.key))
+    return created
+
+
+def summarize(durations: list) -> dict:
+    """
+    Throughput and latency percentiles, in milliseconds, of timed iterations.
+    """
+    ordered = sorted(durations)
+    total = sum(ordered)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        'iterations': len(ordered),
+        'throughput_per_s': len(ordered) / total if total else None,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'min_ms': ordered[0] * 1000,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def measure(func, iterations: int, warmup: int = 3, before=None) -> dict:
+    """
+    Time func over iterations runs after a few untimed warmup runs.
+
+    before runs ahead of every iteration, outside the timed region.
+    """
+    for i in range(warmup):
+        if before:
+            before(i)
+        func(i)
+    durations = []
+    for i in range(iterations):
+        if before:
+            before(i)
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def measure_payloads(data, iterations: int) -> dict:
+    """
+    Encode time and size of the same data in every wire format, plain and compressed.
+    """
+    results = {}
+    for renderer in [ContactsJSONRenderer(), *(renderer_class() for renderer_class in COMPACT_RENDERERS)]:
+        content = renderer.render_plain(data)
+        name = f'payload_{renderer.format}'
+        results[name] = {**measure(lambda i: renderer.render_plain(data), iterations), 'bytes': len(content)}
+        for encoding in supported_encodings():
+            results[f'{name}_{encoding}'] = {
+                **measure(lambda i: compress(renderer.render_plain(data), encoding), iterations),
+                'bytes': len(compress(content, encoding)),
+            }
+    return results
+
+
+def _check(response, expected):
+    if response.status_code != expected:
+        raise RuntimeError(f'Expected {expected}, got {response.status_code}: {response.content[:200]!r}')
+
+
+@override_settings(CACHES=BENCHMARK_CACHES, CONTACTS_SHARED_CACHE=True)
+def run_benchmarks(users: int = 10, contacts_per_user: int = 1000, iterations: int = 200, page_size: int = 50) -> dict:
+    """
+    Seed the current database and benchmark the API and serializers in-process.
+
+    Caching goes to a private in-memory cache for the duration of the run,
+    which counts as shared since the whole run stays in this process.
+
+    Return:
+        results keyed by benchmark name, with run metadata under 'meta'
+    """
+    seeded = seed(users, contacts_per_user)
+    client = Client()
+    auth = [{'HTTP_AUTHORIZATION': f'Token {key}'} for _, key in seeded]
+    details = [
+        (reverse('contact-detail', kwargs={'pk': pk}), auth[i])
+        for i, (user, _) in enumerate(seeded)
+        for pk in Contact.objects.filter(owner=user).values_list('id', flat=True)[:20]
+    ]
+    list_url = reverse('contact-list') + f'?page_size={page_size}'
+    slow_iterations = max(5, iterations // 10)
+    results = {}
+
+    def cold(i):
+        cache.clear()
+
+    results['contact_list_cold'] = measure(
+        lambda i: _check(client.get(list_url, **auth[i % users]), 200), iterations, before=cold)
+    results['contact_list_cached'] = measure(
+        lambda i: _check(client.get(list_url, **auth[i % users]), 200), iterations)
+    results['contact_list_no_notes'] = measure(
+        lambda i: _check(client.get(list_url + '&fields=id,first_name,last_name,email,phone', **auth[i % users]), 200),
+        iterations, before=cold)
+    results['contact_list_columnar'] = measure(
+        lambda i: _check(client.get(
+            list_url, HTTP_ACCEPT='application/vnd.contacts.columnar+json', **auth[i % users]), 200),
+        iterations, before=cold)
+    results['contact_list_gzip'] = measure(
+        lambda i: _check(client.get(list_url, HTTP_ACCEPT_ENCODING='gzip', **auth[i % users]), 200),
+        iterations, before=cold)
+    results['contact_detail_cold'] = measure(
+        lambda i: _check(client.get(details[i % len(details)][0], **details[i % len(details)][1]), 200),
+        iterations, before=cold)
+    # Login throttling would turn most of these away with a 429.
+    with override_settings(CONTACTS_LOGIN_THROTTLE_RATES={}):
+        results['user_login'] = measure(
+            lambda i: _check(client.post(
+                reverse('user-login'),
+                {'username': f'bench_user_{i % users}', 'password': BENCHMARK_PASSWORD},
+                content_type='application/json'), 200),
+            slow_iterations)
+    results['user_create'] = measure(
+        lambda i: _check(client.post(
+            reverse('user-create'),
+            {'username': f'bench_new_{time.time_ns()}', 'password': BENCHMARK_PASSWORD,
+             'email': f'new{time.time_ns()}@test.com', 'first_name': 'New', 'last_name': 'User'},
+            content_type='application/json'), 201),
+        slow_iterations)
+
+    page = list(Contact.objects.filter(owner=seeded[0][0]).select_related('owner')[:page_size])
+    data = ContactSerializer(page, many=True).data
+    results['serializer_contact_page'] = measure(
+        lambda i: ContactSerializer(page, many=True).data, iterations)
+    results['renderer_contact_page'] = measure(
+        lambda i: JSONRenderer().render(data), iterations)
+    fields = ContactSerializer.Meta.fields
+    rows = list(Contact.objects.filter(owner=seeded[0][0]).values(*[f for f in fields if f != 'owner'])[:page_size])
+    username = seeded[0][0].username
+    results['fast_contact_page'] = measure(
+        lambda i: dumps_json(contact_rows(rows, fields, username)), iterations)
+    # A full page of the largest size clients may ask for, as the list view sends it.
+    columns = [f for f in fields if f != 'owner']
+    largest = Contact.objects.filter(owner=seeded[0][0]).values(*columns)[:ContactCursorPagination.max_page_size]
+    results.update(measure_payloads(
+        {'next': None, 'previous': None, 'results': contact_rows(largest, fields, username)}, iterations))
+
+    token_cache.clear()
+    cache.clear()
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'users': users,
+            'contacts_per_user': contacts_per_user,
+            'iterations': iterations,
+            'page_size': page_size,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, metric: str = 'p50_ms') -> list:
+    """
+    Rows of (benchmark, baseline, current, ratio) for a metric present in both runs.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get(metric)
+        after = result.get(metric)
+        if before and after is not None:
+            rows.append((name, before, after, after / before))
+    return rows
+
+
+def dumps(results: dict) -> str:
+    return json.dumps(results, indent=2, sort_keys=True)
@@ -0,0 +1,240 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from contacts.formats import FormatError, read_contacts
+from contacts.models import Contact, ContactStats, ContactTag, SyncState
+from contacts.serializers import ContactSerializer
+from contacts.signals import contacts_bulk_changed
+
+
+def _flush(owner, batch):
+    for contact in batch:
+        contact.normalize_identifiers()
+    with transaction.atomic():
+        SyncState.objects.stamp(owner.id, batch)
+        ContactStats.objects.record_contacts(owner.id, batch)
+        Contact.objects.bulk_create(batch)
+    return len(batch)
+
+
+def import_contacts(owner, fileobj, fmt: str, batch_size: int = None, progress=None) -> dict:
+    """
+    Validate and insert contacts from an uploaded file in batches.
+
+    Rows are validated with ContactSerializer as they are read and written with
+    one bulk_create per batch, each batch in its own transaction, so a bad row
+    only costs itself and a failure mid-file keeps earlier batches. progress,
+    if given, is called with the number of rows read after every batch.
+
+    Return:
+        a report with the number of contacts created and the errors per row
+    """
+    batch_size = batch_size or getattr(settings, 'CONTACTS_IMPORT_BATCH_SIZE', 1000)
+    max_errors = getattr(settings, 'CONTACTS_IMPORT_MAX_ERRORS', 1000)
+    created = 0
+    failed = 0
+    rows = 0
+    errors = []
+    batch = []
+
+    def report(row, error):
+        nonlocal failed
+        failed += 1
+        if len(errors) < max_errors:
+            errors.append({'row': row, 'errors': error})
+
+    try:
+        for row, data, error in read_contacts(fileobj, fmt):
+            rows += 1
+            if error is not None:
+                report(row, {'non_field_errors': [error]})
+                continue
+            serializer = ContactSerializer(data=data)
+            if not serializer.is_valid():
+                report(row, serializer.errors)
+                continue
+            batch.append(Contact(owner=owner, **serializer.validated_data))
+            if len(batch) >= batch_size:
+                created += _flush(owner, batch)
+                batch = []
+                if progress is not None:
+                    progress(rows)
+        if batch:
+            created += _flush(owner, batch)
+        if progress is not None:
+            progress(rows)
+    except FormatError as e:
+        report(None, {'non_field_errors': [f'Could not read the rest of the file: {e}']})
+    finally:
+        if created:
+            contacts_bulk_changed.send(sender=Contact, owner_id=owner.id)
+
+    return {'created': created, 'failed': failed, 'errors': errors}
+
+
+def purge_tombstones(before) -> int:
+    """
+    Hard delete the tombstones of contacts deleted before a cutoff.
+
+    Each owner's purged_revision moves up to the newest purged tombstone, so
+    sync tokens that could have missed a purged deletion are answered with a
+    410 GONE instead.
+
+    Return:
+        the number of tombstones removed
+    """
+    purged = 0
+    owners = (
+        Contact.all_objects.filter(deleted__lt=before)
+        .values('owner_id').annotate(newest=Max('revision')).order_by())
+    for owner in owners:
+        with transaction.atomic():
+            SyncState.objects.filter(
+                owner_id=owner['owner_id'], purged_revision__lt=owner['newest'],
+            ).update(purged_revision=owner['newest'])
+            tombstones = Contact.all_objects.filter(
+                owner_id=owner['owner_id'], deleted__lt=before, revision__lte=owner['newest'])
+            # Tombstones are invisible to everything but sync, so skip loading
+            # them and sending a post_delete for each; that also skips the
+            # cascade, so their tag memberships go first.
+            memberships = ContactTag.objects.filter(owner_id=owner['owner_id'], contact__in=tombstones)
+            memberships._raw_delete(memberships.db)
+            purged += tombstones._raw_delete(tombstones.db)
+        contacts_bulk_changed.send(sender=Contact, owner_id=owner['owner_id'])
+    return purged
+
+
+def _delete_in_chunks(queryset, chunk_size: int):
+    """
+    Raw delete the rows of a queryset chunk_size at a time, yielding the size of each chunk.
+    """
+    model = queryset.model
+    while True:
+        chunk = model._base_manager.filter(pk__in=queryset.order_by().values('pk')[:chunk_size])
+        with transaction.atomic():
+            count = chunk._raw_delete(chunk.db)
+        if not count:
+            return
+        yield count
+
+
+def delete_user(user, chunk_size: int = None, progress=None) -> int:
+    """
+    Delete a user and everything they own, their contacts a chunk at a time.
+
+    Cascading from the user would load every contact and delete them all in
+    one long transaction. Instead tag memberships, then contacts, tombstones
+    included, go in raw DELETEs of at most chunk_size rows, each committed on
+    its own, before the token and the user itself. Deleting again after an
+    interruption picks up where it stopped. progress, if given, is called with
+    the rows deleted so far and the total after every chunk.
+
+    Return:
+        the number of contacts deleted
+    """
+    chunk_size = chunk_size or getattr(settings, 'CONTACTS_DELETE_CHUNK_SIZE', 1000)
+    memberships = ContactTag.objects.filter(owner_id=user.id)
+    contacts = Contact.all_objects.filter(owner_id=user.id)
+    total = memberships.count() + contacts.count()
+    done = deleted = 0
+    if progress is not None:
+        progress(done, total)
+    for queryset in (memberships, contacts):
+        for count in _delete_in_chunks(queryset, chunk_size):
+            done += count
+            if queryset is contacts:
+                deleted += count
+            if progress is not None:
+                progress(done, max(total, done))
+    contacts_bulk_changed.send(sender=Contact, owner_id=user.id)
+    Token.objects.filter(user_id=user.id).delete()
+    user.delete()
+    return deleted
+
+
+def tag_contacts(owner, tag, add=(), remove=()) -> dict:
+    """
+    Add contacts to a tag and take others off it, in one statement each.
+
+    Only the owner's live contacts can be added; ids that are not are reported
+    as missing.
+
+    Return:
+        the number of memberships added and removed, and the missing ids
+    """
+    found = set(Contact.objects.filter(owner=owner, pk__in=set(add)).values_list('pk', flat=True))
+    with transaction.atomic():
+        existing = set(
+            ContactTag.objects.filter(owner=owner, tag=tag, contact_id__in=found).values_list('contact_id', flat=True))
+        ContactTag.objects.bulk_create(
+            [ContactTag(owner=owner, tag=tag, contact_id=pk) for pk in sorted(found - existing)],
+            ignore_conflicts=True)
+        removed, _ = ContactTag.objects.filter(owner=owner, tag=tag, contact_id__in=set(remove)).delete()
+    if found - existing or removed:
+        contacts_bulk_changed.send(sender=Contact, owner_id=owner.id)
+    return {
+        'added': len(found - existing),
+        'removed': removed,
+        'missing': sorted(set(add) - found),
+    }
+
+
+def apply_operations(owner, operations) -> list:
+    """
+    Apply a batch of updates and deletes to an owner's contacts.
+
+    The contacts are fetched and locked with one owner-scoped query, and every
+    change, deletions included since they only leave tombstones, is written
+    with one bulk_update, all in a single transaction. Operations on missing
+    contacts or with invalid data are reported and skipped.
+
+    Return:
+        one result per operation, in order, with an HTTP style status
+    """
+    results = []
+    changed = []
+    fields = {'revision', 'updated'}
+    now = timezone.now()
+    with transaction.atomic():
+        contacts = (
+            Contact.objects.filter(owner=owner).select_for_update()
+            .in_bulk([operation['id'] for operation in operations]))
+        for operation in operations:
+            contact = contacts.get(operation['id'])
+            if contact is None:
+                results.append({'id': operation['id'], 'status': 404, 'errors': {'detail': 'Not found.'}})
+                continue
+            if operation['op'] == 'delete':
+                contact.deleted = now
+                fields.add('deleted')
+                results.append({'id': contact.id, 'status': 204})
+            else:
+                serializer = ContactSerializer(contact, data=operation['data'], partial=True)
+                if not serializer.is_valid():
+                    results.append({'id': contact.id, 'status': 400, 'errors': serializer.errors})
+                    continue
+                for name, value in serializer.validated_data.items():
+                    setattr(contact, name, value)
+                    fields.add(name)
+                if {'email', 'phone'} & serializer.validated_data.keys():
+                    contact.normalize_identifiers()
+                    fields |= {'email_normalized', 'phone_normalized'}
+                results.append({'id': contact.id, 'status': 200, 'contact': contact})
+            contact.owner = owner
+            contact.updated = now
+            changed.append(contact)
+
+        if changed:
+            SyncState.objects.stamp(owner.id, changed)
+            ContactStats.objects.record_contacts(owner.id, changed)
+            Contact.all_objects.bulk_update(changed, sorted(fields))
+    if changed:
+        contacts_bulk_changed.send(sender=Contact, owner_id=owner.id)
+
+    for result in results:
+        if 'contact' in result:
+            result['contact'] = ContactSerializer(result['contact']).data
+    return results
@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from contacts.instrumentation import incr
+
+
+def cache_is_shared():
+    """
+    Return whether the default cache is shared by every worker, per CONTACTS_SHARED_CACHE.
+
+    Version stamps are bumped in the cache of the process that handled the
+    write, so anything keyed on them may only be reused when every process
+    sees the same cache.
+    """
+    return getattr(settings, 'CONTACTS_SHARED_CACHE', False)
+
+
+def _owner_version_key(owner_id):
+    return f'contacts:owner-version:{owner_id}'
+
+
+def get_owner_version(owner_id):
+    """
+    Return the current version stamp of an owner's contacts.
+
+    The stamp changes whenever one of the owner's contacts is written, so anything
+    derived from the address book can be keyed on it and goes stale on its own.
+    """
+    key = _owner_version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_owner_version(owner_id):
+    """
+    Mark every cached artifact of an owner's contacts as stale.
+    """
+    cache.set(_owner_version_key(owner_id), time.time_ns(), timeout=None)
+
+
+class OwnerCachedResponseMixin:
+    """
+    Cache rendered GET responses per owner and answer conditional requests.
+
+    Entries are keyed on the owner's version stamp, so any write to their contacts
+    orphans only their entries. Responses carry a strong ETag over the rendered
+    body, and a matching If-None-Match gets a 304 NOT MODIFIED. Headers named
+    in cached_headers are stored with the body and sent again on every hit.
+
+    Without a shared cache nothing is stored, since other workers would never
+    see the version bumps; responses still carry an ETag over their body.
+    """
+    cached_headers = ()
+
+    def get_response_cache_key(self, request):
+        digest = hashlib.sha256(
+            f'{request.get_full_path()}|{request.accepted_media_type}'.encode()).hexdigest()
+        version = get_owner_version(request.user.id)
+        return f'contacts:response:{request.user.id}:{version}:{digest}', version
+
+    def get(self, request, *args, **kwargs):
+        if not cache_is_shared():
+            self._response_cache_key = (None, None)
+            return super().get(request, *args, **kwargs)
+        key, version = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            incr('cache_hit')
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type'], headers=entry.get('headers'))
+            return self.conditional_response(request, response, entry['etag'], version)
+        incr('cache_miss')
+        self._response_cache_key = (key, version)
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        pending = getattr(self, '_response_cache_key', None)
+        if pending is None or response.status_code != 200 or response.streaming:
+            return response
+
+        key, version = pending
+        self._response_cache_key = None
+        if hasattr(response, 'render'):
+            response.render()
+        etag = '"%s"' % hashlib.sha256(response.content).hexdigest()[:32]
+        if key is not None:
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': etag,
+                'headers': {name: response[name] for name in self.cached_headers if name in response},
+            }, getattr(settings, 'CONTACTS_RESPONSE_CACHE_TIMEOUT', 300))
+        return self.conditional_response(request, response, etag, version)
+
+    def conditional_response(self, request, response, etag, version):
+        response['ETag'] = etag
+        if version is not None:
+            response['Last-Modified'] = http_date(version // 1_000_000_000)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Accept'])
+        # Only the ETag decides: Last-Modified has one second resolution, which
+        # is too coarse to tell apart writes made within the same second. The
+        # comparison is weak, as compression hands out W/ prefixed ETags.
+        known = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+        if etag in known:
+            not_modified = HttpResponseNotModified()
+            for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Vary'):
+                if header in response:
+                    not_modified[header] = response[header]
+            return not_modified
+        return response
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Random bytes added to the gzip header so response lengths stop leaking the
+# content (BREACH); Django's GZipMiddleware uses the same defence.
+GZIP_RANDOM_BYTES = 100
+
+
+def supported_encodings() -> list:
+    """
+    Content codings this server can produce, most compact first.
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """
+    Map each coding of an Accept-Encoding header to its quality value.
+    """
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header: str):
+    """
+    The supported coding the client prefers, or None if it accepts none of them.
+
+    Ties go to the more compact coding.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in supported_encodings():
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'CONTACTS_BROTLI_QUALITY', 5))
+    return compress_string(content, max_random_bytes=GZIP_RANDOM_BYTES)
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compress an iterable of byte chunks as it is consumed.
+    """
+    if encoding == 'gzip':
+        yield from compress_sequence(chunks, max_random_bytes=GZIP_RANDOM_BYTES)
+        return
+    compressor = brotli.Compressor(quality=getattr(settings, 'CONTACTS_BROTLI_QUALITY', 5))
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+        # Hand every chunk on right away, so a slow export still streams.
+        data = compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
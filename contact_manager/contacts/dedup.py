@@ -0,0 +1,203 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from contacts.models import Contact, ContactStats, ContactTag, SyncState
+from contacts.signals import contacts_bulk_changed
+
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(name: str) -> str:
+    """
+    American Soundex code of a name, so spelling variants like Smith and Smyth match.
+    """
+    letters = [char for char in name.lower() if char.isalpha()]
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do.
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def blocking_keys(contact: dict) -> set:
+    """
+    Keys of the blocks a contact falls in; only contacts sharing a block are compared.
+    """
+    keys = set()
+    if contact['phone_normalized']:
+        keys.add(('phone', contact['phone_normalized']))
+    if contact['email_normalized']:
+        keys.add(('email', contact['email_normalized']))
+    last_name = soundex(contact['last_name'])
+    if last_name:
+        keys.add(('name', last_name, contact['first_name'].strip()[:1].lower()))
+    return keys
+
+
+def full_name(contact: dict) -> str:
+    return f"{contact['first_name']} {contact['last_name']}".lower().strip()
+
+
+def similarity(a: dict, b: dict) -> float:
+    """
+    Score from 0 to 1 of how likely two contacts are the same person.
+
+    Starts from how alike the names are; each matching phone or email closes
+    half of the remaining gap to 1, and each conflicting one costs a tenth.
+    """
+    score = SequenceMatcher(None, full_name(a), full_name(b)).ratio()
+    for field in ('phone_normalized', 'email_normalized'):
+        left, right = a[field], b[field]
+        if left and right:
+            score = score + (1 - score) / 2 if left == right else score * 0.9
+    return score
+
+
+def candidate_pairs(contacts: list, window: int):
+    """
+    Yield the index pairs worth scoring: those sharing a blocking key.
+
+    Blocks are sorted by name and each contact is only compared with the next
+    window contacts of a block, so a huge block (a very common surname) costs
+    O(n * window) comparisons instead of O(n^2).
+    """
+    blocks = defaultdict(list)
+    for index, contact in enumerate(contacts):
+        for key in blocking_keys(contact):
+            blocks[key].append(index)
+    seen = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda index: (contacts[index]['last_name'].lower(), contacts[index]['first_name'].lower()))
+        for position, left in enumerate(members):
+            for right in members[position + 1:position + 1 + window]:
+                pair = (left, right) if left < right else (right, left)
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair
+
+
+def find_clusters(contacts: list, threshold: float = None, window: int = None) -> list:
+    """
+    Group likely duplicates among contact rows.
+
+    Pairs scoring at least threshold are joined with union-find, so a cluster
+    also holds contacts linked only through another member.
+
+    Return:
+        clusters as dicts of contact ids and the best pair score, largest first
+    """
+    threshold = threshold if threshold is not None else getattr(settings, 'CONTACTS_DEDUP_THRESHOLD', 0.85)
+    window = window or getattr(settings, 'CONTACTS_DEDUP_WINDOW', 20)
+    parent = list(range(len(contacts)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    best = defaultdict(float)
+    for left, right in candidate_pairs(contacts, window):
+        score = similarity(contacts[left], contacts[right])
+        if score >= threshold:
+            root_left, root_right = find(left), find(right)
+            if root_left != root_right:
+                parent[root_right] = root_left
+                best[root_left] = max(best[root_left], best.pop(root_right, 0))
+            best[root_left] = max(best[root_left], score)
+
+    groups = defaultdict(list)
+    for index in range(len(contacts)):
+        groups[find(index)].append(contacts[index]['id'])
+    clusters = [
+        {'ids': sorted(ids), 'score': round(best[root], 3)}
+        for root, ids in groups.items() if len(ids) > 1
+    ]
+    clusters.sort(key=lambda cluster: (-len(cluster['ids']), -cluster['score'], cluster['ids'][0]))
+    return clusters
+
+
+def owner_clusters(owner_id) -> list:
+    """
+    Clusters of likely duplicates in an owner's address book.
+    """
+    rows = list(
+        Contact.objects.filter(owner_id=owner_id).order_by('id')
+        .values('id', 'first_name', 'last_name', 'email_normalized', 'phone_normalized'))
+    return find_clusters(rows)
+
+
+def merge_contacts(owner, primary, duplicates) -> Contact:
+    """
+    Fold duplicates into a primary contact and delete them.
+
+    Empty fields of the primary are filled from the duplicates in the order
+    given, all distinct notes are kept, separated by blank lines, and the
+    primary joins every tag of the duplicates.
+
+    Return:
+        the merged primary contact, or None if any of the contacts is missing
+    """
+    ids = [primary, *duplicates]
+    with transaction.atomic():
+        contacts = Contact.objects.filter(owner=owner).select_for_update().in_bulk(ids)
+        if len(contacts) != len(set(ids)):
+            return None
+        primary = contacts[primary]
+        duplicates = [contacts[pk] for pk in duplicates]
+        for duplicate in duplicates:
+            for field in ('first_name', 'last_name', 'email', 'phone'):
+                if not getattr(primary, field):
+                    setattr(primary, field, getattr(duplicate, field))
+        primary.normalize_identifiers()
+        notes = []
+        for contact in (primary, *duplicates):
+            note = contact.notes.strip()
+            if note and note not in notes:
+                notes.append(note)
+        primary.notes = '\n\n'.join(notes)
+
+        now = timezone.now()
+        for contact in (primary, *duplicates):
+            contact.updated = now
+        for duplicate in duplicates:
+            duplicate.deleted = now
+        changed = [*duplicates, primary]
+        SyncState.objects.stamp(owner.id, changed)
+        ContactStats.objects.record_contacts(owner.id, changed)
+        Contact.all_objects.bulk_update(
+            changed, [
+                'first_name', 'last_name', 'email', 'phone', 'email_normalized', 'phone_normalized', 'notes',
+                'updated', 'deleted', 'revision',
+            ])
+        tag_ids = (
+            ContactTag.objects.filter(owner=owner, contact_id__in=[duplicate.id for duplicate in duplicates])
+            .values_list('tag_id', flat=True).distinct())
+        ContactTag.objects.bulk_create(
+            [ContactTag(owner=owner, tag_id=tag_id, contact=primary) for tag_id in tag_ids], ignore_conflicts=True)
+    contacts_bulk_changed.send(sender=Contact, owner_id=owner.id)
+    primary.owner = owner
+    return primary
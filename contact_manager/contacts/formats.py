@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+
+
+CONTACT_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'notes']
+
+FORMATS = {
+    'csv': ('text/csv', ('.csv',)),
+    'jsonl': ('application/jsonl', ('.jsonl', '.ndjson')),
+    'vcard': ('text/vcard', ('.vcf', '.vcard')),
+}
+
+_CONTENT_TYPE_ALIASES = {
+    'application/x-ndjson': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+    'text/x-vcard': 'vcard',
+    'application/vnd.ms-excel': 'csv',
+}
+
+
+class FormatError(Exception):
+    pass
+
+
+def detect_format(name: str = '', content_type: str = '', requested: str = '') -> str:
+    """
+    Work out the file format from an explicit request, a filename or a content type.
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise FormatError(f"Unsupported format '{requested}', expected one of: {', '.join(FORMATS)}.")
+        return requested
+    name = (name or '').lower()
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    for fmt, (media_type, extensions) in FORMATS.items():
+        if name.endswith(extensions) or content_type == media_type:
+            return fmt
+    if content_type in _CONTENT_TYPE_ALIASES:
+        return _CONTENT_TYPE_ALIASES[content_type]
+    raise FormatError('Could not detect the file format, pass one of: ' + ', '.join(FORMATS) + '.')
+
+
+def read_csv(lines):
+    """
+    Yield (row, data, error) for each record of a CSV file with a header row.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [name.strip().lower().replace(' ', '_') for name in header]
+    for values in reader:
+        if not any(values):
+            continue
+        data = {
+            column: value for column, value in zip(columns, values)
+            if column in CONTACT_FIELDS
+        }
+        yield reader.line_num, data, None
+
+
+def read_jsonl(lines):
+    """
+    Yield (row, data, error) for each line of a JSON Lines file.
+    """
+    for row, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(data, dict):
+            yield row, None, 'Expected a JSON object.'
+            continue
+        yield row, {key: value for key, value in data.items() if key in CONTACT_FIELDS}, None
+
+
+def _unescape_vcard(value):
+    out = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            out.append('\n' if char in 'nN' else char)
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+def _unfold_vcard(lines):
+    current = None
+    for row, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current = (current[0], current[1] + line[1:])
+            continue
+        if current is not None:
+            yield current
+        current = (row, line)
+    if current is not None:
+        yield current
+
+
+def read_vcard(lines):
+    """
+    Yield (row, data, error) for each card of a vCard file.
+
+    Only N/FN, the first EMAIL and TEL, and NOTE are kept. The row is the line the
+    card starts on.
+    """
+    card = None
+    start = 0
+    for row, line in _unfold_vcard(lines):
+        if not line.strip():
+            continue
+        name, _, value = line.partition(':')
+        prop = name.split(';')[0].split('.')[-1].upper()
+        if prop == 'BEGIN' and value.strip().upper() == 'VCARD':
+            card, start = {}, row
+        elif card is None:
+            continue
+        elif prop == 'END':
+            yield start, card, None
+            card = None
+        elif prop == 'N':
+            parts = value.split(';')
+            card['last_name'] = _unescape_vcard(parts[0])
+            card['first_name'] = _unescape_vcard(parts[1]) if len(parts) > 1 else ''
+        elif prop == 'FN' and 'first_name' not in card:
+            first, _, last = _unescape_vcard(value).strip().rpartition(' ')
+            card['first_name'], card['last_name'] = (first, last) if first else (last, '')
+        elif prop == 'EMAIL':
+            card.setdefault('email', _unescape_vcard(value))
+        elif prop == 'TEL':
+            card.setdefault('phone', _unescape_vcard(value))
+        elif prop == 'NOTE':
+            card['notes'] = _unescape_vcard(value)
+    if card is not None:
+        yield start, None, 'Unterminated vCard, missing END:VCARD.'
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'vcard': read_vcard,
+}
+
+
+def read_contacts(fileobj, fmt: str):
+    """
+    Stream (row, data, error) tuples out of a binary file object.
+
+    The file is decoded incrementally, so only the current record is held in memory.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    try:
+        yield from READERS[fmt](text)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise FormatError(str(e))
+    finally:
+        text.detach()
+
+
+class _Echo:
+    """
+    File-like object whose write returns the value, so csv.writer can stream.
+    """
+
+    def write(self, value):
+        return value
+
+
+def write_csv(rows):
+    """
+    Yield a CSV header and one line per contact field dict.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CONTACT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in CONTACT_FIELDS])
+
+
+def write_jsonl(rows):
+    """
+    Yield one JSON object per line per contact field dict.
+    """
+    for row in rows:
+        yield json.dumps({field: row[field] for field in CONTACT_FIELDS}, ensure_ascii=False) + '\n'
+
+
+def _escape_vcard(value):
+    return (value.replace('\\', '\\\\').replace(',', '\\,').replace(';', '\\;')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def write_vcard(rows):
+    """
+    Yield one vCard 3.0 per contact field dict.
+    """
+    for row in rows:
+        first_name, last_name = _escape_vcard(row['first_name']), _escape_vcard(row['last_name'])
+        lines = [
+            'BEGIN:VCARD',
+            'VERSION:3.0',
+            f'N:{last_name};{first_name};;;',
+            f'FN:{first_name} {last_name}'.rstrip(),
+        ]
+        if row['email']:
+            lines.append('EMAIL:' + _escape_vcard(row['email']))
+        if row['phone']:
+            lines.append('TEL:' + _escape_vcard(row['phone']))
+        if row['notes']:
+            lines.append('NOTE:' + _escape_vcard(row['notes']))
+        lines.append('END:VCARD')
+        yield '\r\n'.join(lines) + '\r\n'
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'vcard': write_vcard,
+}
+
+
+def write_contacts(rows, fmt: str):
+    """
+    Stream encoded chunks for an iterable of contact field dicts.
+    """
+    for chunk in WRITERS[fmt](rows):
+        yield chunk.encode('utf-8')
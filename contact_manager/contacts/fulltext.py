@@ -0,0 +1,164 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from contacts.models import Contact
+
+
+# The search index is created by migration 0007_contact_fulltext: a generated
+# search_vector column on PostgreSQL, and an FTS5 table, contacts_contact_fts,
+# kept in step by triggers on SQLite. See that migration before altering
+# contacts_contact.
+
+
+def search_terms(query: str) -> list:
+    """
+    Lowercased words of a query, without the operators either backend understands.
+    """
+    return re.findall(r'\w+', query.lower())
+
+
+def make_snippet(text: str, terms: list, width: int = None) -> str:
+    """
+    HTML excerpt of text around the first match, with matching words in <mark>.
+
+    Words are matched by a shared stem-like prefix, so notes mentioning an
+    "engine" are highlighted for a search on "engines".
+    """
+    if not text:
+        return ''
+    width = width or getattr(settings, 'CONTACTS_FULLTEXT_SNIPPET_WIDTH', 160)
+    stems = [term[:max(3, len(term) - 2)] for term in terms]
+    pattern = re.compile(r'\b(?:%s)\w*' % '|'.join(map(re.escape, stems)), re.IGNORECASE) if stems else None
+    match = pattern.search(text) if pattern else None
+    start = 0
+    if match is not None and match.start() > width // 3:
+        start = text.find(' ', match.start() - width // 3) + 1
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        if space > start:
+            end = space
+    fragment = text[start:end]
+
+    parts = []
+    position = 0
+    for found in (pattern.finditer(fragment) if pattern else ()):
+        parts.append(escape(fragment[position:found.start()]))
+        parts.append(f'<mark>{escape(found.group())}</mark>')
+        position = found.end()
+    parts.append(escape(fragment[position:]))
+    return ('…' if start else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+
+class FullTextResults(ABC):
+    """
+    Ranked matches, fetched a page at a time, each with a rank and a snippet.
+    """
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    @abstractmethod
+    def _fetch(self, start, stop) -> list:
+        """
+        Return the matches from start to stop, in rank order.
+        """
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        contacts = self._fetch(index.start or 0, index.stop)
+        for contact in contacts:
+            contact.snippet = make_snippet(contact.notes, self.terms)
+        return contacts
+
+
+class QuerySetResults(FullTextResults):
+    def __init__(self, queryset, terms):
+        super().__init__(terms)
+        self.queryset = queryset
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def _fetch(self, start, stop):
+        return list(self.queryset[start:stop])
+
+
+class RankedIdResults(FullTextResults):
+    def __init__(self, ranked, terms):
+        super().__init__(terms)
+        self.ranked = ranked
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def _fetch(self, start, stop):
+        page = self.ranked[start:stop]
+        contacts = Contact.objects.select_related('owner').in_bulk([pk for pk, _ in page])
+        results = []
+        for pk, rank in page:
+            if pk in contacts:
+                contacts[pk].rank = rank
+                results.append(contacts[pk])
+        return results
+
+
+def _postgres_search(owner_id, query):
+    tsquery = "websearch_to_tsquery('english', %s)"
+    return (
+        Contact.objects.filter(owner_id=owner_id)
+        .filter(RawSQL(f'search_vector @@ {tsquery}', [query], output_field=BooleanField()))
+        .annotate(rank=RawSQL(f'ts_rank_cd(search_vector, {tsquery})', [query], output_field=FloatField()))
+        .select_related('owner')
+        .order_by('-rank', 'last_name', 'id'))
+
+
+def _sqlite_search(owner_id, terms):
+    # Quoting every word keeps FTS5 operators in user input from being parsed;
+    # the trailing * makes the last, possibly unfinished, word a prefix.
+    match = ' '.join('"%s"' % term.replace('"', '""') for term in terms) + '*'
+    with connections[router.db_for_read(Contact)].cursor() as cursor:
+        cursor.execute(
+            'SELECT c.id, -bm25(contacts_contact_fts, 10.0, 10.0, 1.0) AS rank '
+            'FROM contacts_contact_fts JOIN contacts_contact c ON c.id = contacts_contact_fts.rowid '
+            'WHERE contacts_contact_fts MATCH %s AND c.owner_id = %s AND c.deleted IS NULL '
+            'ORDER BY rank DESC, c.last_name, c.id',
+            [match, owner_id])
+        return cursor.fetchall()
+
+
+def _sqlite_fts_installed() -> bool:
+    with connections[router.db_for_read(Contact)].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_contact_fts'")
+        return cursor.fetchone() is not None
+
+
+def search_notes(owner_id, query: str) -> FullTextResults:
+    """
+    Full-text search an owner's contacts by notes and names, best matches first.
+
+    PostgreSQL ranks with ts_rank_cd over the generated search_vector column
+    and its GIN index; SQLite with bm25 over the FTS5 table, weighting names
+    above notes. Without either, contacts containing every word are returned
+    unranked.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return QuerySetResults(Contact.objects.none(), terms)
+    if connection.vendor == 'postgresql':
+        return QuerySetResults(_postgres_search(owner_id, query), terms)
+    if connection.vendor == 'sqlite' and _sqlite_fts_installed():
+        return RankedIdResults(_sqlite_search(owner_id, terms), terms)
+
+    queryset = Contact.objects.filter(owner_id=owner_id).select_related('owner')
+    for term in terms:
+        queryset = queryset.filter(
+            Q(notes__icontains=term) | Q(first_name__icontains=term) | Q(last_name__icontains=term))
+    return QuerySetResults(queryset.annotate(rank=Value(0.0, output_field=FloatField())), terms)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from CONTACTS_PBKDF2_ITERATIONS.
+
+    It keeps the stock algorithm name, so existing hashes verify unchanged and
+    are rehashed with the configured iteration count on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'CONTACTS_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with costs taken from CONTACTS_ARGON2_TIME_COST and CONTACTS_ARGON2_MEMORY_COST.
+
+    Needs the optional argon2-cffi package.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'CONTACTS_ARGON2_TIME_COST', None) or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'CONTACTS_ARGON2_MEMORY_COST', None) or Argon2PasswordHasher.memory_cost
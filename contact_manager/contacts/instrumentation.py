@@ -0,0 +1,170 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+
+_current = contextvars.ContextVar('contacts_request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    """
+    Timings and counters collected while one request is handled.
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings['db'] += time.perf_counter() - start
+            self.counters['db_queries'] += 1
+
+
+def start_request():
+    """
+    Begin collecting metrics for the current request and return them with a reset token.
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def incr(name: str, amount: int = 1):
+    """
+    Bump a counter of the current request; a no-op outside an instrumented request.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.counters[name] += amount
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the time spent in the block to a timing of the current request.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+
+
+class MetricsRegistry:
+    """
+    In-process aggregate of request metrics, rendered in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+            self.duration_sum = defaultdict(float)
+            self.timings = defaultdict(float)
+            self.counters = defaultdict(int)
+
+    def observe(self, view: str, method: str, status: int, wall: float, metrics: RequestMetrics):
+        labels = (view, method)
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            self.buckets[labels][bisect.bisect_left(DURATION_BUCKETS, wall)] += 1
+            self.duration_sum[labels] += wall
+            for name, seconds in metrics.timings.items():
+                self.timings[(name,) + labels] += seconds
+            for name, count in metrics.counters.items():
+                self.counters[(name,) + labels] += count
+
+    def render(self) -> str:
+        def fmt(**labels):
+            return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+        lines = [
+            '# HELP contacts_http_requests_total Requests handled, by view, method and status.',
+            '# TYPE contacts_http_requests_total counter',
+        ]
+        with self._lock:
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f'contacts_http_requests_total{{{fmt(view=view, method=method, status=status)}}} {count}')
+
+            lines += [
+                '# HELP contacts_http_request_duration_seconds Wall time spent handling requests.',
+                '# TYPE contacts_http_request_duration_seconds histogram',
+            ]
+            for (view, method), counts in sorted(self.buckets.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(
+                        f'contacts_http_request_duration_seconds_bucket'
+                        f'{{{fmt(view=view, method=method, le=bound)}}} {cumulative}')
+                lines.append(
+                    f'contacts_http_request_duration_seconds_sum{{{fmt(view=view, method=method)}}} '
+                    f'{self.duration_sum[(view, method)]}')
+                lines.append(
+                    f'contacts_http_request_duration_seconds_count{{{fmt(view=view, method=method)}}} {cumulative}')
+
+            lines += [
+                '# HELP contacts_phase_seconds_total Time spent in each phase of handling requests.',
+                '# TYPE contacts_phase_seconds_total counter',
+            ]
+            for (name, view, method), seconds in sorted(self.timings.items()):
+                lines.append(f'contacts_phase_seconds_total{{{fmt(phase=name, view=view, method=method)}}} {seconds}')
+
+            lines += [
+                '# HELP contacts_events_total Events counted while handling requests, such as queries and cache hits.',
+                '# TYPE contacts_events_total counter',
+            ]
+            for (name, view, method), count in sorted(self.counters.items()):
+                lines.append(f'contacts_events_total{{{fmt(event=name, view=view, method=method)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(wall: float, metrics: RequestMetrics) -> str:
+    """
+    Build a Server-Timing header value out of a request's metrics.
+    """
+    entries = [f'total;dur={wall * 1000:.2f}']
+    for name, seconds in sorted(metrics.timings.items()):
+        entry = f'{name};dur={seconds * 1000:.2f}'
+        if name == 'db':
+            entry += f';desc="{metrics.counters["db_queries"]} queries"'
+        entries.append(entry)
+    for name in ('cache_hit', 'cache_miss'):
+        if metrics.counters.get(name):
+            entries.append(f'{name};desc="{metrics.counters[name]}"')
+    return ', '.join(entries)
+
+
+def metrics_view(request):
+    """
+    Expose the aggregated request metrics to a Prometheus scraper.
+    """
+    if not getattr(settings, 'CONTACTS_INSTRUMENTATION', False):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,208 @@
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from contacts.bulk import delete_user, import_contacts
+from contacts.dedup import owner_clusters
+from contacts.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """
+    Raised from JobContext.progress() once the job has been asked to stop.
+    """
+
+
+@dataclass
+class JobKind:
+    run: Callable
+    # Whether clients may queue it through the jobs endpoint.
+    public: bool = False
+    # Rerunning must be safe for a kind to be retried.
+    max_attempts: int = 1
+    # Called once the job has finished for good, whatever the outcome.
+    cleanup: Optional[Callable] = None
+
+
+JOB_KINDS = {}
+
+
+def job_kind(name: str, **options):
+    """
+    Register a function as the runner of a kind of job.
+
+    The function is called with a JobContext and the job's params as keyword
+    arguments, and returns the job's JSON result.
+    """
+    def register(run):
+        JOB_KINDS[name] = JobKind(run, **options)
+        return run
+    return register
+
+
+class JobContext:
+    """
+    What a running job gets to see: its owner and a way to report progress.
+    """
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.owner = job.owner
+
+    def progress(self, done: int, total: int = None):
+        """
+        Record how far the job has got, and stop it if it has been cancelled.
+
+        Also serves as a heartbeat, so long steps should report often.
+        """
+        update = {'progress': done, 'heartbeat': timezone.now()}
+        if total is not None:
+            update['total'] = total
+        Job.objects.filter(pk=self.job.pk).update(**update)
+        if Job.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCancelled
+
+
+def enqueue(owner, kind: str, **params) -> Job:
+    """
+    Queue a job of a registered kind for an owner.
+    """
+    return Job.objects.create(
+        owner=owner, kind=kind, params=params, max_attempts=JOB_KINDS[kind].max_attempts)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    How long to wait before another attempt: CONTACTS_JOB_RETRY_DELAY, doubled per attempt made.
+    """
+    return timedelta(seconds=getattr(settings, 'CONTACTS_JOB_RETRY_DELAY', 30) * 2 ** max(0, attempts - 1))
+
+
+def _cleanup(job: Job):
+    kind = JOB_KINDS.get(job.kind)
+    if kind is not None and kind.cleanup is not None:
+        kind.cleanup(**job.params)
+
+
+def _finish(job: Job, status: str, **fields):
+    finished = Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+        status=status, finished=timezone.now(), heartbeat=None, **fields)
+    if finished:
+        _cleanup(job)
+
+
+def cancel(job: Job) -> bool:
+    """
+    Cancel a queued job right away, or ask a running one to stop.
+
+    Return:
+        False if the job had already finished
+    """
+    if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.CANCELLED, cancel_requested=True, finished=timezone.now()):
+        _cleanup(job)
+    elif not Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(cancel_requested=True):
+        return False
+    job.refresh_from_db()
+    return True
+
+
+def run_job(pk):
+    """
+    Run a claimed job to completion and record how it ended.
+
+    A failure queues the job again after retry_delay() while it has attempts
+    left; after that the job fails with the error.
+    """
+    job = Job.objects.select_related('owner').get(pk=pk)
+    kind = JOB_KINDS.get(job.kind)
+    try:
+        if kind is None:
+            raise LookupError(f'Unknown kind of job: {job.kind}')
+        result = kind.run(JobContext(job), **job.params)
+    except JobCancelled:
+        _finish(job, Job.CANCELLED)
+    except Exception as e:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.kind, job.attempts)
+        error = f'{type(e).__name__}: {e}'
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                status=Job.QUEUED, error=error, heartbeat=None,
+                run_after=timezone.now() + retry_delay(job.attempts))
+        else:
+            _finish(job, Job.FAILED, error=error)
+    else:
+        _finish(job, Job.SUCCEEDED, result=result, error='')
+
+
+def beat(pks):
+    """
+    Refresh the heartbeat of jobs still being worked on.
+    """
+    if pks:
+        Job.objects.filter(pk__in=pks, status=Job.RUNNING).update(heartbeat=timezone.now())
+
+
+def recover_stale(timeout: int = None) -> int:
+    """
+    Requeue or fail running jobs whose worker stopped sending heartbeats.
+
+    Return:
+        the number of jobs recovered
+    """
+    timeout = timeout or getattr(settings, 'CONTACTS_JOB_TIMEOUT', 600)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat__lt=now - timedelta(seconds=timeout))
+    recovered = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, heartbeat=None, error='The worker running this job stopped responding.',
+        run_after=now)
+    for job in stale:
+        if Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                status=Job.FAILED, heartbeat=None, finished=now,
+                error='The worker running this job stopped responding.'):
+            _cleanup(job)
+            recovered += 1
+    return recovered
+
+
+def _delete_upload(path, **params):
+    default_storage.delete(path)
+
+
+@job_kind('import_contacts', cleanup=_delete_upload)
+def import_contacts_job(context, path, fmt):
+    """
+    Import an uploaded file saved to storage by ContactBulkImport.
+
+    Not retried: rows of the batches written before a failure would be
+    imported twice.
+    """
+    with default_storage.open(path, 'rb') as fileobj:
+        return import_contacts(context.owner, fileobj.file, fmt, progress=context.progress)
+
+
+@job_kind('find_duplicates', public=True, max_attempts=3)
+def find_duplicates_job(context):
+    """
+    Cluster the owner's likely duplicate contacts.
+    """
+    clusters = owner_clusters(context.owner.id)
+    context.progress(1, 1)
+    return {'clusters': clusters}
+
+
+@job_kind('delete_user', max_attempts=3)
+def delete_user_job(context):
+    """
+    Delete the owner's account. The job goes with it, so only its progress is seen.
+    """
+    return {'deleted': delete_user(context.owner, progress=context.progress)}
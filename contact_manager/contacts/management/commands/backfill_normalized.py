@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from contacts.models import Contact
+from contacts.signals import contacts_bulk_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill in the normalized email and phone columns of existing contacts, '
+        'a chunk of rows at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read and written per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        scanned = updated = 0
+        while True:
+            # Walk the primary key so each chunk is an index range scan and a
+            # restart after an interruption only redoes one chunk.
+            chunk = list(
+                Contact.all_objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'owner', 'email', 'phone', 'email_normalized', 'phone_normalized')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+            stale = []
+            for contact in chunk:
+                email, phone = contact.email_normalized, contact.phone_normalized
+                contact.normalize_identifiers()
+                if (email, phone) != (contact.email_normalized, contact.phone_normalized):
+                    stale.append(contact)
+            if stale:
+                with transaction.atomic():
+                    Contact.all_objects.bulk_update(stale, ['email_normalized', 'phone_normalized'])
+                # bulk_update skips the model signals, so drop the cached lookups
+                # and listings of every owner in the chunk here.
+                for owner_id in sorted({contact.owner_id for contact in stale}):
+                    contacts_bulk_changed.send(sender=Contact, owner_id=owner_id)
+                updated += len(stale)
+            self.stdout.write(f'Scanned {scanned} contacts, updated {updated}.')
+        self.stdout.write(f'Done: updated {updated} of {scanned} contacts.')
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from contacts.benchmark import compare, dumps, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the contacts API and serializers in-process against a throwaway '
+        'test database, printing JSON results that can be diffed between commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to seed.')
+        parser.add_argument('--contacts', type=int, default=1000, help='Contacts seeded per user.')
+        parser.add_argument('--iterations', type=int, default=200, help='Timed iterations per benchmark.')
+        parser.add_argument('--page-size', type=int, default=50, help='Page size of list requests.')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+        parser.add_argument('--compare', help='Previous JSON results to compare p50 latencies against.')
+
+    def handle(self, *args, **options):
+        # Query logging would skew timings and grow without bound.
+        with override_settings(DEBUG=False):
+            setup_test_environment()
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = run_benchmarks(
+                    users=options['users'],
+                    contacts_per_user=options['contacts'],
+                    iterations=options['iterations'],
+                    page_size=options['page_size'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(dumps(results))
+        else:
+            self.stdout.write(dumps(results))
+
+        for name, result in sorted(results['results'].items()):
+            if 'bytes' in result:
+                self.stderr.write(f"{name:<28} {result['bytes']:>10} bytes {result['p50_ms']:>10.3f} ms")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            for name, before, after, ratio in compare(baseline, results):
+                self.stderr.write(f'{name:<28} {before:>10.3f} ms -> {after:>10.3f} ms  x{ratio:.2f}')
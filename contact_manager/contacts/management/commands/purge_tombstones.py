@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from contacts.bulk import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        'Permanently remove the tombstones of deleted contacts once every client '
+        'has had time to sync them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'CONTACTS_TOMBSTONE_RETENTION_DAYS', 30),
+            help='Keep tombstones of contacts deleted within this many days.')
+
+    def handle(self, *args, **options):
+        purged = purge_tombstones(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(f'Purged {purged} tombstones.')
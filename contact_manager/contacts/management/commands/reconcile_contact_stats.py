@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from contacts.models import ContactStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the per-owner contact stats from the contacts themselves and '
+        'repair the owners whose stats have drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', type=int, action='append', help='Only reconcile this user id; repeatable.')
+
+    def handle(self, *args, **options):
+        owner_ids = options['owner'] or User.objects.order_by('id').values_list('id', flat=True).iterator()
+        checked = repaired = 0
+        for owner_id in owner_ids:
+            checked += 1
+            # One owner per transaction, so writers are only held up briefly.
+            if ContactStats.objects.reconcile(owner_id):
+                repaired += 1
+                self.stdout.write(f'Repaired the stats of user {owner_id}.')
+        self.stdout.write(f'Done: repaired {repaired} of {checked} users.')
@@ -0,0 +1,101 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _setup_process():
+    # Worker processes are spawned, not forked, so they neither share the
+    # parent's database connections nor have Django set up yet.
+    django.setup()
+
+
+def _run(pk):
+    from contacts.jobs import run_job
+    try:
+        run_job(pk)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs in a pool of worker processes, polling '
+        'the job table for new ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=getattr(settings, 'CONTACTS_JOB_PROCESSES', 2),
+            help='Jobs run at once; 0 runs them one at a time in this process.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=getattr(settings, 'CONTACTS_JOB_POLL_INTERVAL', 1.0),
+            help='Seconds to wait between checks for new jobs.')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            self.run_inline(options['poll_interval'], options['once'])
+            return
+        while True:
+            try:
+                self.run_pool(options['processes'], options['poll_interval'], options['once'])
+                return
+            except BrokenProcessPool:
+                # The jobs that were running are recovered once their
+                # heartbeats go stale.
+                self.stderr.write('A worker process died; starting a new pool.')
+
+    def run_inline(self, poll_interval, once):
+        from contacts.jobs import recover_stale, run_job
+        from contacts.models import Job
+
+        while True:
+            recover_stale()
+            job = Job.objects.claim()
+            if job is not None:
+                run_job(job.pk)
+                self.stdout.write(f'Ran job {job.pk} ({job.kind}).')
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
+
+    def run_pool(self, processes, poll_interval, once):
+        from contacts.jobs import beat, recover_stale
+        from contacts.models import Job
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_setup_process) as pool:
+            running = {}
+            while True:
+                recover_stale()
+                # Jobs are claimed here and only handed to a process once it
+                # is free, so a busy worker leaves the rest to other workers.
+                while len(running) < processes:
+                    job = Job.objects.claim()
+                    if job is None:
+                        break
+                    running[pool.submit(_run, job.pk)] = job
+                if not running:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        self.stderr.write(f'Job {job.pk} ({job.kind}) crashed: {e}')
+                    else:
+                        self.stdout.write(f'Ran job {job.pk} ({job.kind}).')
+                beat([job.pk for job in running.values()])
@@ -0,0 +1,169 @@
+import cProfile
+import itertools
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from contacts.compression import choose_encoding, compress, compress_stream
+from contacts.instrumentation import finish_request, registry, server_timing, start_request, timed
+
+
+class InstrumentationMiddleware:
+    """
+    Record per-request wall time, queries, serialization time and cache hits.
+
+    Enabled with CONTACTS_INSTRUMENTATION. Every response gets a Server-Timing
+    header, totals are aggregated for the /metrics endpoint, and one request in
+    CONTACTS_PROFILE_SAMPLE_RATE is run under cProfile and dumped into
+    CONTACTS_PROFILE_DIR.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'CONTACTS_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, 'CONTACTS_PROFILE_SAMPLE_RATE', 0)
+        self.profile_dir = getattr(settings, 'CONTACTS_PROFILE_DIR', None)
+        self._requests = itertools.count(1)
+        self._requests_lock = threading.Lock()
+
+    def should_profile(self):
+        if not self.sample_rate or not self.profile_dir:
+            return False
+        with self._requests_lock:
+            return next(self._requests) % self.sample_rate == 0
+
+    def start(self):
+        """
+        Begin measuring a request; pass the result to stop() once it is handled.
+        """
+        metrics, token = start_request()
+        profiler = cProfile.Profile() if self.should_profile() else None
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.db_wrapper))
+            if profiler is not None:
+                profiler.enable()
+        except BaseException:
+            stack.close()
+            finish_request(token)
+            raise
+        return metrics, token, profiler, stack, start
+
+    def stop(self, state):
+        metrics, token, profiler, stack, start = state
+        try:
+            if profiler is not None:
+                profiler.disable()
+            stack.close()
+        finally:
+            finish_request(token)
+        return time.perf_counter() - start
+
+    def finish(self, request, response, state, wall):
+        metrics, _, profiler, _, _ = state
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        registry.observe(view, request.method, response.status_code, wall, metrics)
+        response['Server-Timing'] = server_timing(wall, metrics)
+        if profiler is not None:
+            self.dump_profile(profiler, view)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            wall = self.stop(state)
+        return self.finish(request, response, state, wall)
+
+    async def __acall__(self, request):
+        # Queries run by sync_to_async threads see the same connections, as
+        # they share the request's context.
+        state = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            wall = self.stop(state)
+        return self.finish(request, response, state, wall)
+
+    def dump_profile(self, profiler, view):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{time.strftime("%Y%m%dT%H%M%S")}-{view.replace(":", "_")}-{os.getpid()}-{time.time_ns() % 1_000_000}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, whichever the client prefers.
+
+    Bodies shorter than CONTACTS_COMPRESSION_MIN_SIZE bytes are sent as they
+    are, since compressing them costs more than it saves. Streaming responses
+    are compressed chunk by chunk. Strong ETags are weakened, as the bytes on
+    the wire no longer match the representation they were computed over.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.min_size = getattr(settings, 'CONTACTS_COMPRESSION_MIN_SIZE', 1024)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.streaming:
+            if response.is_async:
+                return response
+        elif len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            with timed('compress'):
+                compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import IntegrityError, migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stop before the index if an email is already used by several users, in any case.
+
+    Emails used to be compared case-sensitively, so older databases can hold
+    Foo@x.com and foo@x.com. Which account keeps the address is for a person
+    to decide, so nothing is changed here.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    duplicates = list(
+        User.objects.exclude(email='').annotate(email_lower=Lower('email'))
+        .values('email_lower').annotate(count=Count('id')).filter(count__gt=1)
+        .order_by('email_lower').values_list('email_lower', flat=True))
+    if not duplicates:
+        return
+    users = (
+        User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=duplicates[:50])
+        .order_by('email_lower', 'id').values_list('email_lower', 'id'))
+    ids = {}
+    for email, pk in users:
+        ids.setdefault(email, []).append(str(pk))
+    listed = '\n'.join(f'  {email}: users {", ".join(pks)}' for email, pks in ids.items())
+    more = f'\n  ...and {len(duplicates) - 50} more' if len(duplicates) > 50 else ''
+    raise IntegrityError(
+        'Cannot make emails unique regardless of case: these emails belong to more than one user.\n'
+        f'{listed}{more}\n'
+        'Change or clear the email of all but one user of each, then run migrate again.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0003_contact_owner_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Emails are unique regardless of case. Users without an email are left
+    # out, and lookups on LOWER(email) are served by the index.
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email <> ''",
+            reverse_sql='DROP INDEX auth_user_email_lower_uniq',
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_existing_contacts(apps, schema_editor):
+    """
+    Give existing contacts distinct revisions per owner, oldest first.
+    """
+    Contact = apps.get_model('contacts', 'Contact')
+    SyncState = apps.get_model('contacts', 'SyncState')
+    Contact.objects.update(updated=models.F('created'))
+    owner_ids = Contact.objects.values_list('owner_id', flat=True).distinct().order_by()
+    for owner_id in owner_ids.iterator():
+        contacts = list(Contact.objects.filter(owner_id=owner_id).order_by('id').only('id'))
+        for revision, contact in enumerate(contacts, start=1):
+            contact.revision = revision
+        Contact.objects.bulk_update(contacts, ['revision'], batch_size=1000)
+        SyncState.objects.create(owner_id=owner_id, revision=len(contacts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('contacts', '0004_user_email_lower_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sync_state', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('revision', models.BigIntegerField(default=0)),
+                ('purged_revision', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='deleted',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='revision',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(number_existing_contacts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['owner', 'revision'], name='contact_owner_revision_idx'),
+        ),
+    ]
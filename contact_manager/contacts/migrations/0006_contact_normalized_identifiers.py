@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0005_contact_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Existing rows are filled in by the backfill_normalized command.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_owner_email_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_owner_phone_idx',
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['owner', 'email_normalized'], include=('first_name', 'last_name'), name='contact_owner_email_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['owner', 'phone_normalized'], include=('first_name', 'last_name'), name='contact_owner_phone_norm_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations
+
+
+# The full-text search index lives on contacts_contact itself, which
+# constrains every later migration that touches that table:
+#
+# - PostgreSQL: search_vector is a generated column over first_name,
+#   last_name and notes, so changing the type of those columns fails until
+#   the column is dropped and added again.
+# - SQLite: Django alters a table by rebuilding it, which drops the triggers
+#   below and leaves contacts_contact_fts stale. A migration that alters
+#   contacts_contact on SQLite must create the triggers again and rebuild the
+#   FTS table (with its own frozen copy of the statements), or keep the change
+#   state-only with SeparateDatabaseAndState, as 0009_contact_tags does.
+#
+# The statements are frozen here: this migration must keep doing what it did
+# when it was written, whatever later happens to contacts.fulltext.
+
+# PostgreSQL: a stored tsvector generated from the names (weight A) and the
+# notes (weight B), kept up to date by the database itself.
+POSTGRES_CREATE = [
+    "ALTER TABLE contacts_contact ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(first_name, '') || ' ' || coalesce(last_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(notes, '')), 'B')) STORED",
+    'CREATE INDEX IF NOT EXISTS contacts_contact_search_vector ON contacts_contact USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS contacts_contact_search_vector',
+    'ALTER TABLE contacts_contact DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite: an external content FTS5 table over the same columns, kept in step
+# with triggers.
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_contact_fts USING fts5("
+    "first_name, last_name, notes, content='contacts_contact', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS contacts_contact_fts_insert AFTER INSERT ON contacts_contact BEGIN '
+    'INSERT INTO contacts_contact_fts(rowid, first_name, last_name, notes) '
+    'VALUES (new.id, new.first_name, new.last_name, new.notes); END',
+    'CREATE TRIGGER IF NOT EXISTS contacts_contact_fts_delete AFTER DELETE ON contacts_contact BEGIN '
+    "INSERT INTO contacts_contact_fts(contacts_contact_fts, rowid, first_name, last_name, notes) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.notes); END",
+    'CREATE TRIGGER IF NOT EXISTS contacts_contact_fts_update '
+    'AFTER UPDATE OF first_name, last_name, notes ON contacts_contact BEGIN '
+    "INSERT INTO contacts_contact_fts(contacts_contact_fts, rowid, first_name, last_name, notes) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.notes); "
+    'INSERT INTO contacts_contact_fts(rowid, first_name, last_name, notes) '
+    'VALUES (new.id, new.first_name, new.last_name, new.notes); END',
+    "INSERT INTO contacts_contact_fts(contacts_contact_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS contacts_contact_fts_insert',
+    'DROP TRIGGER IF EXISTS contacts_contact_fts_delete',
+    'DROP TRIGGER IF EXISTS contacts_contact_fts_update',
+    'DROP TABLE IF EXISTS contacts_contact_fts',
+]
+
+
+def sqlite_has_fts5(cursor) -> bool:
+    cursor.execute('PRAGMA compile_options')
+    return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_CREATE
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            if not sqlite_has_fts5(cursor):
+                return
+        statements = SQLITE_CREATE
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0006_contact_normalized_identifiers'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext, drop_fulltext),
+    ]
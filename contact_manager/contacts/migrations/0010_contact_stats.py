@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:42
+
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_letter(last_name):
+    # Frozen copy of contacts.normalize.index_letter as it was when the stats
+    # were introduced; later changes to the rules come with their own
+    # migration, or a run of reconcile_contact_stats.
+    initial = unicodedata.normalize('NFKD', last_name.strip()[:1])[:1].upper()
+    return initial if 'A' <= initial <= 'Z' else '#'
+
+
+def count_existing_contacts(apps, schema_editor):
+    """
+    Fill in the stats of every owner with contacts.
+    """
+    Contact = apps.get_model('contacts', 'Contact')
+    ContactStats = apps.get_model('contacts', 'ContactStats')
+    owners = Contact.objects.values('owner_id').annotate(last_modified=models.Max('updated')).order_by()
+    for owner in owners.iterator():
+        names = Contact.objects.filter(owner_id=owner['owner_id'], deleted__isnull=True).values_list(
+            'last_name', flat=True)
+        letters = Counter(map(index_letter, names.iterator()))
+        ContactStats.objects.create(
+            owner_id=owner['owner_id'], total=sum(letters.values()), letters=dict(sorted(letters.items())),
+            last_modified=owner['last_modified'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('contacts', '0009_contact_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactStats',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contact_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('letters', models.JSONField(default=dict)),
+                ('last_modified', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(count_existing_contacts, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,344 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from contacts.normalize import index_letter, normalize_email, normalize_phone
+
+
+class SyncStateManager(models.Manager):
+    def allocate(self, owner_id, count: int = 1) -> int:
+        """
+        Reserve count consecutive revisions for an owner and return the last one.
+
+        Call it inside the transaction that writes the contacts: the row lock
+        taken by the UPDATE is held until commit, so an owner's revisions
+        become visible in the order they were handed out.
+        """
+        if not self.filter(owner_id=owner_id).update(revision=F('revision') + count):
+            self.get_or_create(owner_id=owner_id)
+            self.filter(owner_id=owner_id).update(revision=F('revision') + count)
+        return self.filter(owner_id=owner_id).values_list('revision', flat=True).get()
+
+    def stamp(self, owner_id, contacts):
+        """
+        Give each of an owner's contacts its own new revision, in order, ahead of a bulk write.
+        """
+        last = self.allocate(owner_id, len(contacts))
+        for revision, contact in enumerate(contacts, start=last - len(contacts) + 1):
+            contact.revision = revision
+
+
+class SyncState(models.Model):
+    """
+    Per-owner revision counter behind the contact sync tokens.
+
+    purged_revision is the newest tombstone revision that has been purged;
+    sync tokens older than that can no longer be brought up to date.
+    """
+    owner = models.OneToOneField('auth.User', primary_key=True, related_name='sync_state', on_delete=models.CASCADE)
+    revision = models.BigIntegerField(default=0)
+    purged_revision = models.BigIntegerField(default=0)
+
+    objects = SyncStateManager()
+
+
+def _live_names(states) -> list:
+    return [state[0] for state in states if state is not None and state[1] is None]
+
+
+class ContactStatsManager(models.Manager):
+    def record(self, owner_id, before=(), after=()):
+        """
+        Move an owner's stats from one set of live last names to another.
+
+        before holds the last names a write takes out of the live contacts and
+        after those it puts in; a rename is in both. Call it inside the
+        transaction of the write, after SyncState.objects.allocate() or
+        stamp(), whose row lock keeps concurrent writers of the same owner
+        from overwriting each other's counts.
+        """
+        change = Counter(map(index_letter, after))
+        change.subtract(map(index_letter, before))
+        now = timezone.now()
+        # Edits that leave every count alone only need the timestamp moved.
+        if not any(change.values()) and self.filter(owner_id=owner_id).update(last_modified=now):
+            return
+        stats = self.select_for_update().filter(owner_id=owner_id).first() or self.model(owner_id=owner_id)
+        letters = dict(stats.letters)
+        for letter, count in change.items():
+            letters[letter] = letters.get(letter, 0) + count
+        stats.letters = {letter: count for letter, count in sorted(letters.items()) if count > 0}
+        stats.total = max(0, stats.total + len(after) - len(before))
+        stats.last_modified = now
+        stats.save(force_insert=stats._state.adding)
+
+    def record_contacts(self, owner_id, contacts):
+        """
+        Record a bulk write of contacts, from their saved state to their current one.
+
+        Call it in the transaction of the write, right before it.
+        """
+        before = [contact.saved_state() for contact in contacts]
+        after = [(contact.last_name, contact.deleted) for contact in contacts]
+        for contact, state in zip(contacts, after):
+            contact._saved_state = state
+        self.record(owner_id, before=_live_names(before), after=_live_names(after))
+
+    def reconcile(self, owner_id) -> bool:
+        """
+        Recount an owner's stats from their contacts and store them if they were off.
+
+        Return:
+            whether the stored stats were off
+        """
+        with transaction.atomic():
+            # Writers hold the sync state row until they commit; an owner
+            # without one has never had a contact written.
+            list(SyncState.objects.select_for_update().filter(owner_id=owner_id).values_list('pk'))
+            stats = self.select_for_update().filter(owner_id=owner_id).first() or self.model(owner_id=owner_id)
+            names = Contact.objects.filter(owner_id=owner_id).values_list('last_name', flat=True)
+            letters = dict(sorted(Counter(map(index_letter, names.iterator())).items()))
+            total = sum(letters.values())
+            if (stats.total, stats.letters) == (total, letters):
+                return False
+            if stats.last_modified is None:
+                stats.last_modified = Contact.all_objects.filter(owner_id=owner_id).aggregate(
+                    last=Max('updated'))['last']
+            stats.total, stats.letters = total, letters
+            stats.save(force_insert=stats._state.adding)
+        return True
+
+
+class ContactStats(models.Model):
+    """
+    Per-owner summary of the live contacts, so counts need no COUNT(*).
+
+    letters maps the index letter of last names (see index_letter()) to the
+    number of contacts filed under it, for alphabet jump navigation. Every
+    write of contacts updates the row in the same transaction; the
+    reconcile_contact_stats command repairs any drift.
+    """
+    owner = models.OneToOneField(
+        'auth.User', primary_key=True, related_name='contact_stats', on_delete=models.CASCADE)
+    total = models.PositiveIntegerField(default=0)
+    letters = models.JSONField(default=dict)
+    last_modified = models.DateTimeField(null=True, blank=True)
+
+    objects = ContactStatsManager()
+
+
+class ContactManager(models.Manager):
+    """
+    Live contacts only; tombstones are reached through Contact.all_objects.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted__isnull=True)
 
 
 class Contact(models.Model):
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    deleted = models.DateTimeField(null=True, blank=True)
+    revision = models.BigIntegerField(default=0)
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     email = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=14, blank=True)
     notes = models.TextField(blank=True)
-    owner = models.ForeignKey('auth.User', related_name='contacts', on_delete=models.CASCADE)
+    # Shadow columns for exact lookups, kept in step by normalize_identifiers().
+    email_normalized = models.CharField(max_length=100, blank=True, editable=False)
+    phone_normalized = models.CharField(max_length=16, blank=True, editable=False)
+    owner = models.ForeignKey('auth.User', related_name='contacts', on_delete=models.CASCADE, db_index=False)
+    tags = models.ManyToManyField('Tag', through='ContactTag', related_name='contacts', blank=True)
+
+    objects = ContactManager()
+    all_objects = models.Manager()
+
+
+    class Meta:
+        ordering = ['last_name', 'id']
+        indexes = [
+            # Leads with owner_id, so it also replaces the plain foreign key index.
+            models.Index(fields=['owner', 'last_name', 'id'], name='contact_owner_last_name_idx'),
+            models.Index(
+                fields=['owner', 'email_normalized'], include=['first_name', 'last_name'],
+                name='contact_owner_email_norm_idx'),
+            models.Index(
+                fields=['owner', 'phone_normalized'], include=['first_name', 'last_name'],
+                name='contact_owner_phone_norm_idx'),
+            models.Index(fields=['owner', 'revision'], name='contact_owner_revision_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        contact = super().from_db(db, field_names, values)
+        contact._saved_state = contact._loaded_state()
+        return contact
+
+    def _loaded_state(self):
+        loaded = self.__dict__
+        if 'last_name' in loaded and 'deleted' in loaded:
+            return self.last_name, self.deleted
+        return None
+
+    def saved_state(self):
+        """
+        The stored (last_name, deleted) of the contact, or None if it has not been saved yet.
+
+        Known without a query when the contact was loaded with both fields.
+        """
+        if self._state.adding:
+            return None
+        state = getattr(self, '_saved_state', None)
+        if state is None:
+            state = Contact.all_objects.filter(pk=self.pk).values_list('last_name', 'deleted').first()
+        return state
+
+    def normalize_identifiers(self):
+        """
+        Refresh the normalized email and phone; bulk writes must call this themselves.
+        """
+        self.email_normalized = normalize_email(self.email)
+        self.phone_normalized = normalize_phone(self.phone)
+
+    def save(self, *args, **kwargs):
+        """
+        Stamp every write with the owner's next revision and normalized
+        identifiers, and keep the owner's ContactStats in step.
+        """
+        self.normalize_identifiers()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'revision', 'updated'}
+            if {'email', 'phone'} & update_fields:
+                update_fields |= {'email_normalized', 'phone_normalized'}
+            kwargs['update_fields'] = update_fields
+        with transaction.atomic(using=kwargs.get('using')):
+            self.revision = SyncState.objects.allocate(self.owner_id)
+            before = self.saved_state()
+            super().save(*args, **kwargs)
+            after = (self.last_name, self.deleted)
+            if update_fields is not None and before is not None:
+                after = tuple(
+                    value if name in update_fields else saved
+                    for name, value, saved in zip(('last_name', 'deleted'), after, before))
+            ContactStats.objects.record(self.owner_id, before=_live_names([before]), after=_live_names([after]))
+        self._saved_state = after
+
+    def delete(self, using=None, keep_parents=False):
+        """
+        Leave a tombstone so syncing clients learn about the deletion.
+
+        Tombstones are hard deleted later by the purge_tombstones command.
+        """
+        self.deleted = timezone.now()
+        self.save(using=using, update_fields=['deleted'])
+        return 1, {self._meta.label: 1}
+
+
+class Tag(models.Model):
+    """
+    A label an owner groups their contacts under.
+    """
+    owner = models.ForeignKey('auth.User', related_name='tags', on_delete=models.CASCADE, db_index=False)
+    name = models.CharField(max_length=50)
+    created = models.DateTimeField(auto_now_add=True)
+
+
+    class Meta:
+        ordering = ['name', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name'], name='tag_owner_name_uniq'),
+        ]
+
+
+class ContactTag(models.Model):
+    """
+    A contact's membership of a tag.
+
+    The owner is repeated from the contact so tag listings and counts are
+    served by the (owner, tag, contact) index alone.
+    """
+    owner = models.ForeignKey('auth.User', related_name='+', on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, related_name='memberships', on_delete=models.CASCADE, db_index=False)
+    contact = models.ForeignKey(Contact, related_name='memberships', on_delete=models.CASCADE, db_index=False)
+
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'tag', 'contact'], name='contacttag_owner_tag_contact_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['contact'], name='contacttag_contact_idx'),
+        ]
+
+
+class JobManager(models.Manager):
+    def claim(self):
+        """
+        Mark the next due job as running and return it, or None if none is due.
+
+        The status check in the UPDATE makes the claim atomic without holding
+        locks, so any number of workers can poll the same table.
+        """
+        now = timezone.now()
+        due = self.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+        for pk in due.values_list('pk', flat=True)[:10]:
+            claimed = self.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=F('attempts') + 1, started=now, heartbeat=now)
+            if claimed:
+                return self.get(pk=pk)
+        return None
+
+
+class Job(models.Model):
+    """
+    A long-running operation on an owner's data, run by the run_jobs worker.
+
+    Jobs are queued, claimed by a worker, and end up succeeded, failed or
+    cancelled; failed attempts are queued again, later each time, until
+    max_attempts is used up.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+    owner = models.ForeignKey('auth.User', related_name='jobs', on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    cancel_requested = models.BooleanField(default=False)
+    run_after = models.DateTimeField(default=timezone.now)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
 
 
     class Meta:
-        ordering = ['last_name']
\ No newline at end of file
+        ordering = ['-created', '-id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['owner', 'created'], name='job_owner_created_idx'),
+        ]
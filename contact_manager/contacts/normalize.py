@@ -0,0 +1,65 @@
+import unicodedata
+
+from django.conf import settings
+
+try:
+    import phonenumbers
+except ImportError:
+    phonenumbers = None
+
+
+def normalize_email(email: str) -> str:
+    """
+    Trim and lowercase an email so addresses compare regardless of case.
+    """
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Format a phone number as E.164, or return '' when it cannot be.
+
+    Numbers without a country code are taken to be in
+    CONTACTS_PHONE_DEFAULT_REGION. Uses the phonenumbers package when it is
+    installed; otherwise only North American numbers are recognised without
+    a leading + or 00.
+    """
+    phone = phone.strip()
+    if not phone:
+        return ''
+    region = getattr(settings, 'CONTACTS_PHONE_DEFAULT_REGION', 'US')
+    if phonenumbers is not None:
+        try:
+            number = phonenumbers.parse(phone, region)
+        except phonenumbers.NumberParseException:
+            return ''
+        if not phonenumbers.is_possible_number(number):
+            return ''
+        return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+    digits = ''.join(char for char in phone if char.isdigit())
+    if phone.startswith('+'):
+        international = digits
+    elif digits.startswith('00'):
+        international = digits[2:]
+    elif region in ('US', 'CA') and len(digits) == 10:
+        international = '1' + digits
+    elif region in ('US', 'CA') and len(digits) == 11 and digits.startswith('1'):
+        international = digits
+    else:
+        return ''
+    # E.164 allows at most 15 digits; anything under 8 is not a full number.
+    if not 8 <= len(international) <= 15 or international.startswith('0'):
+        return ''
+    return '+' + international
+
+
+def index_letter(last_name: str) -> str:
+    """
+    The letter a last name is filed under in the alphabet index, or '#'.
+
+    Accents are dropped, so 'Élan' is filed under E; names that do not start
+    with a letter from A to Z go under '#'.
+    """
+    initial = unicodedata.normalize('NFKD', last_name.strip()[:1])[:1].upper()
+    return initial if 'A' <= initial <= 'Z' else '#'
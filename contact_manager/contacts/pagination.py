@@ -0,0 +1,92 @@
+import json
+
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+class ContactSearchPagination(PageNumberPagination):
+    """
+    Pages of ranked search results.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def keyset(queryset, position=None, reverse: bool = False):
+    """
+    Order contacts by (last_name, id) and start after a position, or before it when reversed.
+
+    The row value comparison, (last_name, id) > (%s, %s), bounds a range scan
+    of the (owner, last_name, id) index on both columns, so a page within a
+    long run of one last name costs the same as any other.
+    """
+    queryset = queryset.order_by(*(('-last_name', '-id') if reverse else ('last_name', 'id')))
+    if position is None:
+        return queryset
+    quote = connections[queryset.db].ops.quote_name
+    table = quote(queryset.model._meta.db_table)
+    condition = f"({table}.{quote('last_name')}, {table}.{quote('id')}) {'<' if reverse else '>'} (%s, %s)"
+    return queryset.filter(RawSQL(condition, position, output_field=BooleanField()))
+
+
+class ContactCursorPagination(CursorPagination):
+    """
+    Keyset pages of an address book, so deep pages cost the same as the first.
+
+    The cursor holds the (last_name, id) of the row a page starts after, or
+    ends before when paging back, instead of DRF's first-field position and
+    offset. Rows written between requests never shift a page.
+    """
+    ordering = ('last_name', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        position = reverse = None
+        if self.cursor is not None:
+            position, reverse = self.decode_position(self.cursor.position), self.cursor.reverse
+
+        rows = list(keyset(queryset, position, reverse)[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), more
+        else:
+            self.has_next, self.has_previous = more, position is not None and bool(self.page)
+        return self.page
+
+    def decode_position(self, position):
+        if position is None:
+            return None
+        try:
+            last_name, pk = json.loads(position)
+            return [str(last_name), int(pk)]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, row) -> str:
+        if isinstance(row, dict):
+            return json.dumps([row['last_name'], row['id']])
+        return json.dumps([row.last_name, row.id])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.encode_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.encode_position(self.page[0])))
@@ -10,7 +10,7 @@ class IsOwner(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
 
 class IsUser(permissions.BasePermission):
@@ -0,0 +1,94 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions
+
+
+_use_replica = contextvars.ContextVar('contacts_use_replica', default=False)
+
+
+def replicas() -> list:
+    return getattr(settings, 'CONTACTS_READ_REPLICAS', [])
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Send the reads made inside the block to a read replica, if any are configured.
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def _pin_key(owner_id):
+    return f'contacts:replica-pin:{owner_id}'
+
+
+def pin_to_primary(owner_id):
+    """
+    Read an owner's contacts from the primary for a while after they changed.
+
+    Replicas lag behind the primary, so this keeps clients from missing their
+    own writes on the next read.
+    """
+    if replicas():
+        cache.set(_pin_key(owner_id), True, getattr(settings, 'CONTACTS_REPLICA_PIN_SECONDS', 5))
+
+
+def pinned_to_primary(owner_id) -> bool:
+    return cache.get(_pin_key(owner_id), False)
+
+
+class ReplicaRouter:
+    """
+    Route reads made under read_from_replica() to a random replica and
+    everything else to the primary.
+
+    Replicas are aliases listed in CONTACTS_READ_REPLICAS; they mirror the
+    primary, so nothing is migrated on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replicas():
+            return random.choice(replicas())
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests of a view from a read replica, unless the user just
+    changed their contacts.
+
+    The decision is made once the user is authenticated, and holds until the
+    response is finalized.
+    """
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in permissions.SAFE_METHODS and replicas()
+                and not pinned_to_primary(request.user.id)):
+            self._replica_token = _use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        try:
+            return super().finalize_response(request, response, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                _use_replica.reset(self._replica_token)
+                self._replica_token = None
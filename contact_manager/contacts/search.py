@@ -0,0 +1,206 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from contacts.cache import cache_is_shared, get_owner_version
+from contacts.models import Contact
+
+
+def tokenize(text: str) -> list:
+    """
+    Split a name or query into lowercased words.
+    """
+    return text.lower().split()
+
+
+def word_trigrams(word: str, pad_end: bool = True) -> set:
+    """
+    Return the trigrams of a word, padded the same way pg_trgm pads them.
+
+    Query words are not padded at the end so a partially typed word still shares
+    all of its trigrams with the name it is a prefix of.
+    """
+    padded = '  ' + word + (' ' if pad_end else '')
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(word: str) -> int:
+    """
+    Number of typos tolerated for a query word, growing with its length.
+    """
+    return len(word) // 4
+
+
+def prefix_distance(query: str, target: str, limit: int) -> int:
+    """
+    Edit distance between query and the closest prefix of target.
+
+    Only one row of the Levenshtein matrix is kept, and the computation stops as
+    soon as every cell exceeds limit, in which case limit + 1 is returned.
+    """
+    previous = list(range(len(target) + 1))
+    for i, q_char in enumerate(query, start=1):
+        current = [i]
+        for j, t_char in enumerate(target, start=1):
+            cost = 0 if q_char == t_char else 1
+            current.append(min(previous[j - 1] + cost, previous[j] + 1, current[j - 1] + 1))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(min(previous), limit + 1)
+
+
+class NameIndex:
+    """
+    In-process trigram index over the names of one owner's contacts.
+
+    Trigrams narrow the address book down to candidates (a word within k edits of
+    a name shares all but at most 3k of its trigrams with it), and only those are
+    verified with a bounded edit distance.
+    """
+
+    def __init__(self, rows):
+        self.names = {}
+        self.postings = defaultdict(set)
+        for pk, first_name, last_name in rows:
+            words = tokenize(first_name) + tokenize(last_name)
+            self.names[pk] = (words, last_name.lower(), first_name.lower())
+            for word in words:
+                for gram in word_trigrams(word):
+                    self.postings[gram].add(pk)
+
+    def _candidates(self, word):
+        grams = word_trigrams(word, pad_end=False)
+        needed = len(grams) - 3 * max_distance(word)
+        if needed <= 0:
+            return set(self.names)
+        counts = defaultdict(int)
+        for gram in grams:
+            for pk in self.postings.get(gram, ()):
+                counts[pk] += 1
+        return {pk for pk, count in counts.items() if count >= needed}
+
+    def search(self, query: str) -> list:
+        """
+        Return the ids of contacts matching every word of query, best first.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        candidates = None
+        for word in words:
+            found = self._candidates(word)
+            candidates = found if candidates is None else candidates & found
+
+        ranked = []
+        for pk in candidates:
+            names, last_name, first_name = self.names[pk]
+            total = 0
+            for word in words:
+                limit = max_distance(word)
+                best = min((prefix_distance(word, name, limit) for name in names), default=limit + 1)
+                if best > limit:
+                    break
+                total += best
+            else:
+                ranked.append((total, last_name, first_name, pk))
+
+        ranked.sort()
+        return [pk for _, _, _, pk in ranked]
+
+
+class RankedContacts:
+    """
+    Lazily loaded, ordered contacts so a paginator only fetches the current page.
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        ids = self.ids[index]
+        if not isinstance(index, slice):
+            return Contact.objects.get(pk=ids)
+        contacts = Contact.objects.select_related('owner').in_bulk(ids)
+        return [contacts[pk] for pk in ids if pk in contacts]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(owner_id) -> NameIndex:
+    """
+    Return the name index of an owner, rebuilding it if their contacts changed.
+
+    Indexes are kept in a bounded LRU and tagged with the owner's version stamp.
+    The stamp only reflects writes made by other processes when the cache is
+    shared, so without one every call builds a fresh index.
+    """
+    if not cache_is_shared():
+        rows = Contact.objects.filter(owner_id=owner_id).values_list('id', 'first_name', 'last_name')
+        return NameIndex(rows.iterator())
+    version = get_owner_version(owner_id)
+    with _indexes_lock:
+        entry = _indexes.get(owner_id)
+        if entry is not None and entry[0] == version:
+            _indexes.move_to_end(owner_id)
+            return entry[1]
+
+    rows = Contact.objects.filter(owner_id=owner_id).values_list('id', 'first_name', 'last_name')
+    index = NameIndex(rows.iterator())
+
+    with _indexes_lock:
+        _indexes[owner_id] = (version, index)
+        _indexes.move_to_end(owner_id)
+        while len(_indexes) > getattr(settings, 'CONTACTS_SEARCH_INDEX_SIZE', 128):
+            _indexes.popitem(last=False)
+    return index
+
+
+def discard_name_index(owner_id):
+    """
+    Drop the cached name index of an owner in this process.
+    """
+    with _indexes_lock:
+        _indexes.pop(owner_id, None)
+
+
+def _postgres_search(owner_id, query):
+    from django.contrib.postgres.lookups import TrigramWordSimilar
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    from django.db.models import F, Value
+    from django.db.models.functions import Greatest
+
+    queryset = Contact.objects.filter(owner_id=owner_id).select_related('owner')
+    rank = None
+    for word in tokenize(query):
+        queryset = queryset.filter(
+            Q(TrigramWordSimilar(F('first_name'), Value(word)))
+            | Q(TrigramWordSimilar(F('last_name'), Value(word))))
+        similarity = Greatest(
+            TrigramWordSimilarity(word, 'first_name'),
+            TrigramWordSimilarity(word, 'last_name'))
+        rank = similarity if rank is None else rank + similarity
+    if rank is None:
+        return Contact.objects.none()
+    return queryset.annotate(rank=rank).order_by('-rank', 'last_name', 'id')
+
+
+def search_contacts(owner_id, query: str):
+    """
+    Fuzzy search an owner's contacts by name, best matches first.
+
+    PostgreSQL answers from the pg_trgm GIN indexes; other databases use the
+    in-process NameIndex. Either result can be handed straight to a paginator.
+    """
+    if connection.vendor == 'postgresql':
+        return _postgres_search(owner_id, query)
+    return RankedContacts(get_name_index(owner_id).search(query))
@@ -1,22 +1,194 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
-from contacts.models import Contact
+from contacts.availability import taken_users
+from contacts.instrumentation import timed
+from contacts.models import Contact, ContactStats, Job, Tag
 
 
-class ContactSerializer(serializers.HyperlinkedModelSerializer):
+class TimedDataMixin:
+    """
+    Count the time spent building `.data` as serialization time.
+    """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class ContactSerializer(TimedDataMixin, serializers.HyperlinkedModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Contact
         fields = ['owner', 'id', 'first_name', 'last_name', 'email', 'phone', 'notes']
+        list_serializer_class = TimedListSerializer
+
+
+class ContactOperationSerializer(serializers.Serializer):
+    """
+    One item of a batch: update a contact with (partial) data, or delete it.
+    """
+    op = serializers.ChoiceField(choices=['update', 'delete'])
+    id = serializers.IntegerField()
+    data = serializers.DictField(required=False, default=dict)
+
+
+class ContactBatchSerializer(serializers.Serializer):
+    """
+    At most CONTACTS_BATCH_MAX_OPERATIONS operations, each on a different contact.
+    """
+    operations = ContactOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        limit = getattr(settings, 'CONTACTS_BATCH_MAX_OPERATIONS', 500)
+        if len(value) > limit:
+            raise serializers.ValidationError(f'Send at most {limit} operations at once.')
+        ids = [operation['id'] for operation in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError('Each contact can only appear once.')
+        return value
+
+
+class ContactMergeSerializer(serializers.Serializer):
+    """
+    A contact to keep and the duplicates to fold into it.
+    """
+    primary = serializers.IntegerField()
+    duplicates = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+
+    def validate(self, attrs):
+        ids = [attrs['primary'], *attrs['duplicates']]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError('Each contact can only appear once.')
+        return attrs
+
+
+class ContactSearchResultSerializer(ContactSerializer):
+    """
+    A full-text search match: the contact, its rank and an HTML snippet of its notes.
+    """
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta(ContactSerializer.Meta):
+        fields = ContactSerializer.Meta.fields + ['rank', 'snippet']
+
+
+class TagSerializer(serializers.ModelSerializer):
+    """
+    A tag with the number of live contacts in it.
+    """
+    contact_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'contact_count']
+
+    def get_contact_count(self, obj):
+        count = getattr(obj, 'contact_count', None)
+        return obj.contacts.filter(deleted__isnull=True).count() if count is None else count
+
+    def validate_name(self, value):
+        value = value.strip()
+        if not value:
+            raise serializers.ValidationError('This field may not be blank.')
+        taken = Tag.objects.filter(owner=self.context['request'].user, name=value)
+        if self.instance is not None:
+            taken = taken.exclude(pk=self.instance.pk)
+        if taken.exists():
+            raise serializers.ValidationError('You already have a tag with this name.')
+        return value
 
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class TagAssignmentSerializer(serializers.Serializer):
+    """
+    Contacts to add to a tag and to take off it, at most CONTACTS_BATCH_MAX_OPERATIONS in total.
+    """
+    add = serializers.ListField(child=serializers.IntegerField(), default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+    def validate(self, attrs):
+        limit = getattr(settings, 'CONTACTS_BATCH_MAX_OPERATIONS', 500)
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError('Pass contacts to add or remove.')
+        if len(attrs['add']) + len(attrs['remove']) > limit:
+            raise serializers.ValidationError(f'Tag at most {limit} contacts at once.')
+        if set(attrs['add']) & set(attrs['remove']):
+            raise serializers.ValidationError('A contact cannot be both added and removed.')
+        return attrs
+
+
+class ContactStatsSerializer(serializers.ModelSerializer):
+    """
+    The size of an address book, when it last changed and its alphabet index.
+    """
+
+    class Meta:
+        model = ContactStats
+        fields = ['total', 'last_modified', 'letters']
+
+
+def contact_stats(user) -> ContactStats:
+    """
+    A user's stored stats, or empty ones for a user who never had a contact.
+    """
+    try:
+        return user.contact_stats
+    except ContactStats.DoesNotExist:
+        return ContactStats(owner=user)
+
+
+def expanded_fields(request) -> set:
+    """
+    Names of the optional relations a request asked for with `?expand=`.
+    """
+    if request is None:
+        return set()
+    return {name.strip() for name in request.query_params.get('expand', '').split(',') if name.strip()}
+
+
+class UserSerializer(TimedDataMixin, serializers.HyperlinkedModelSerializer):
+    """
+    A user with the size of their address book, its stats and a link to it.
+
+    The link to every contact is only rendered with `?expand=contacts`.
+    """
     contacts = serializers.HyperlinkedRelatedField(
         many=True, 
         view_name='contact-detail', 
         read_only=True)
+    contact_count = serializers.SerializerMethodField()
+    contact_stats = serializers.SerializerMethodField()
+    contacts_url = serializers.SerializerMethodField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'contacts' not in expanded_fields(self.context.get('request')):
+            self.fields.pop('contacts')
+
+    def get_contact_count(self, obj):
+        return contact_stats(obj).total
+
+    def get_contact_stats(self, obj):
+        return ContactStatsSerializer(contact_stats(obj)).data
+
+    def get_contacts_url(self, obj):
+        return reverse('contact-list', request=self.context.get('request'))
 
     def create(self, validated_data):
         user = User.objects.create_user(
@@ -35,16 +207,55 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         return super().update(instance, validated_data)
     
     def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
+        taken_usernames, _ = taken_users(usernames=[value], exclude_pk=getattr(self.instance, 'pk', None))
+        if taken_usernames:
             raise serializers.ValidationError("This username is already taken.")
         return value
 
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        _, taken_emails = taken_users(emails=[value], exclude_pk=getattr(self.instance, 'pk', None))
+        if taken_emails:
             raise serializers.ValidationError("This email is already in use.")
         return value
 
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'password', 'email', 'first_name', 'last_name', 'contacts']
\ No newline at end of file
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'username', 'password', 'email', 'first_name', 'last_name', 'contact_count', 'contact_stats', 'contacts_url', 'contacts']
+
+class AvailabilitySerializer(serializers.Serializer):
+    """
+    Usernames and emails to check, at most CONTACTS_AVAILABILITY_BATCH_SIZE in total.
+    """
+    usernames = serializers.ListField(child=serializers.CharField(max_length=150), default=list)
+    emails = serializers.ListField(child=serializers.CharField(max_length=254), default=list)
+
+    def validate(self, attrs):
+        limit = getattr(settings, 'CONTACTS_AVAILABILITY_BATCH_SIZE', 100)
+        if len(attrs['usernames']) + len(attrs['emails']) > limit:
+            raise serializers.ValidationError(f'Check at most {limit} usernames and emails at once.')
+        return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    A background job, its progress and, once finished, its result or error.
+    """
+    url = serializers.HyperlinkedIdentityField(view_name='job-detail')
+
+    class Meta:
+        model = Job
+        fields = [
+            'url', 'id', 'kind', 'status', 'progress', 'total', 'result', 'error', 'attempts', 'max_attempts',
+            'cancel_requested', 'created', 'started', 'finished',
+        ]
+        read_only_fields = [name for name in fields if name != 'kind']
+
+    def validate_kind(self, value):
+        from contacts.jobs import JOB_KINDS
+
+        kind = JOB_KINDS.get(value)
+        if kind is None or not kind.public:
+            raise serializers.ValidationError(f'"{value}" is not a kind of job that can be queued.')
+        return value
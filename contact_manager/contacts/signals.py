@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from contacts.authentication import token_cache
+from contacts.availability import availability_filter
+from contacts.cache import bump_owner_version
+from contacts.models import Contact, Tag
+from contacts.routers import pin_to_primary
+from contacts.search import discard_name_index
+
+
+# Sent with owner_id after writes that bypass model signals, such as
+# bulk_create, bulk_update or queryset updates and deletes.
+contacts_bulk_changed = Signal()
+
+
+def _invalidate_owner(owner_id):
+    bump_owner_version(owner_id)
+    discard_name_index(owner_id)
+    pin_to_primary(owner_id)
+
+
+@receiver([post_save, post_delete], sender=Contact)
+def contact_changed(sender, instance, **kwargs):
+    """
+    Invalidate everything derived from the owner's contacts.
+    """
+    _invalidate_owner(instance.owner_id)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """
+    Invalidate the owner's contact listings filtered by the tag.
+    """
+    _invalidate_owner(instance.owner_id)
+
+
+@receiver(contacts_bulk_changed)
+def contacts_bulk_changed_handler(sender, owner_id, **kwargs):
+    """
+    Invalidate everything derived from the owner's contacts after a bulk write.
+    """
+    _invalidate_owner(owner_id)
+
+
+@receiver(post_save, sender=User)
+def owner_changed(sender, instance, **kwargs):
+    """
+    Invalidate cached contact responses, which embed the owner's username, and
+    cached authentications, which would otherwise miss password or status changes.
+    Mark the username and email as taken.
+    """
+    bump_owner_version(instance.id)
+    token_cache.discard_user(instance.id)
+    availability_filter.add(instance.username, instance.email)
+
+
+@receiver(post_delete, sender=User)
+def owner_deleted(sender, instance, **kwargs):
+    token_cache.discard_user(instance.id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.discard(instance.key)
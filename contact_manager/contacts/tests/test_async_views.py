@@ -0,0 +1,103 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from contacts.async_views import authenticate
+from contacts.models import Contact
+from contacts.tests.test_contacts import create_contact
+
+
+class AsyncContactViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.user).key}'}
+        for last_name in ['c', 'a', 'b']:
+            create_contact(first_name='first', last_name=last_name, owner=self.user)
+        create_contact(first_name='first', last_name='a', owner=User.objects.create(username='not_test_user'))
+
+    async def test_list_pages(self):
+        """
+        Following the next links walks the user's contacts in last name order.
+        """
+        seen = []
+        url = reverse('async-contact-list') + '?page_size=2'
+        while url:
+            response = await self.async_client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            seen.extend(row['last_name'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, ['a', 'b', 'c'])
+
+    async def test_previous_links(self):
+        """
+        Following the previous links from the last page walks back to the first.
+        """
+        await sync_to_async(create_contact)(first_name='first', last_name='d', owner=self.user)
+        url = reverse('async-contact-list') + '?page_size=2'
+        first = (await self.async_client.get(url, headers=self.headers)).json()
+        self.assertIsNone(first['previous'])
+        data = (await self.async_client.get(first['next'], headers=self.headers)).json()
+        self.assertEqual([row['last_name'] for row in data['results']], ['c', 'd'])
+        self.assertIsNone(data['next'])
+        data = (await self.async_client.get(data['previous'], headers=self.headers)).json()
+        self.assertEqual(data['results'], first['results'])
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['next'], first['next'])
+
+    async def test_cached_user_not_shared(self):
+        """
+        Every request gets its own copy of a cached user.
+        """
+        request = RequestFactory().get('/', headers=self.headers)
+        first = await authenticate(request)
+        second = await authenticate(request)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    async def test_create_read_delete(self):
+        """
+        A contact can be created, read and deleted through the async endpoints.
+        """
+        response = await self.async_client.post(
+            reverse('async-contact-list'),
+            data={'first_name': 'new', 'last_name': 'contact'},
+            content_type='application/json',
+            headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse('async-contact-detail', kwargs={'pk': response.json()['id']})
+
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.json()['owner'], 'test_user')
+
+        response = await self.async_client.delete(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await Contact.objects.filter(last_name='contact').aexists())
+
+    async def test_not_owned_not_found(self):
+        """
+        Another user's contact returns a 404 NOT FOUND.
+        """
+        contact = await sync_to_async(Contact.objects.exclude(owner=self.user).get)()
+        response = await self.async_client.get(
+            reverse('async-contact-detail', kwargs={'pk': contact.pk}), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_search(self):
+        """
+        Searching only returns the user's matches.
+        """
+        response = await self.async_client.get(
+            reverse('async-contact-search'), {'q': 'a'}, headers=self.headers)
+        self.assertEqual(response.json()['count'], 1)
+
+    async def test_unauthenticated(self):
+        """
+        Calling without a valid token returns a 401 UNAUTHORIZED.
+        """
+        response = await self.async_client.get(
+            reverse('async-contact-list'), headers={'Authorization': 'Token invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from contacts.authentication import token_cache
+from contacts.throttling import TokenBucket, parse_rate
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create(username='test_user')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    @override_settings(CONTACTS_SHARED_CACHE=True)
+    def test_cached_token_needs_no_queries(self):
+        """
+        Once a token has been used, authenticating with it again runs no queries.
+        """
+        url = reverse('contact-list')
+        self.client.get(url, **self.auth)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_rejected(self):
+        """
+        A deleted token returns a 401 UNAUTHORIZED even after it was cached.
+        """
+        url = reverse('contact-list')
+        self.assertEqual(self.client.get(url, **self.auth).status_code, status.HTTP_200_OK)
+        self.token.delete()
+        self.assertEqual(self.client.get(url, **self.auth).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+        Saving the user drops their cached tokens, so deactivation applies at once.
+        """
+        url = reverse('contact-list')
+        self.assertEqual(self.client.get(url, **self.auth).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(url, **self.auth).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_discards_cache(self):
+        """
+        Changing the password through the user endpoint drops the cached token.
+        """
+        url = reverse('user-detail', kwargs={'pk': self.user.pk})
+        self.client.get(url, **self.auth)
+        self.assertIsNotNone(token_cache.get(self.token.key))
+        self.client.put(
+            url,
+            data={'username': 'renamed_user', 'password': 'new_pass'},
+            content_type='application/json',
+            **self.auth)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new_pass'))
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_refill(self):
+        """
+        A drained bucket refills at its rate and never beyond its capacity.
+        """
+        bucket = TokenBucket('test-bucket', capacity=2, rate=1.0)
+        self.assertEqual(bucket.take(now=100), 0)
+        self.assertEqual(bucket.take(now=100), 0)
+        self.assertAlmostEqual(bucket.take(now=100.25), 0.75)
+        self.assertEqual(bucket.take(now=101.5), 0)
+        self.assertEqual(bucket.take(now=1000), 0)
+        self.assertEqual(bucket.take(now=1000), 0)
+        self.assertGreater(bucket.take(now=1000), 0)
+
+    def test_parse_rate(self):
+        """
+        DRF style rates become a capacity and a refill rate per second.
+        """
+        self.assertEqual(parse_rate('10/min'), (10, 10 / 60))
+        self.assertEqual(parse_rate('5/s'), (5, 5))
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from contacts.benchmark import compare, run_benchmarks
+
+
+class BenchmarkSmokeTests(TestCase):
+    def test_run_benchmarks(self):
+        """
+        A tiny benchmark run reports every benchmark and can be compared with itself.
+
+        It leaves the configured cache alone.
+        """
+        cache.set('benchmark_sentinel', 1)
+        results = run_benchmarks(users=2, contacts_per_user=5, iterations=3, page_size=2)
+        self.assertEqual(results['meta']['contacts_per_user'], 5)
+        for name in ['contact_list_cold', 'contact_detail_cold', 'user_login', 'user_create', 'serializer_contact_page']:
+            self.assertGreater(results['results'][name]['p50_ms'], 0)
+        self.assertGreater(results['results']['payload_json']['bytes'], results['results']['payload_json_gzip']['bytes'])
+        self.assertGreater(results['results']['payload_json']['bytes'], results['results']['payload_columnar']['bytes'])
+        self.assertTrue(all(ratio == 1 for _, _, _, ratio in compare(results, results)))
+        self.assertEqual(cache.get('benchmark_sentinel'), 1)
@@ -0,0 +1,213 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.models import Contact
+from contacts.tests.test_contacts import create_contact
+
+
+CSV = b"""first_name,last_name,email,phone,notes
+Ada,Lovelace,ada@test.com,1234567890,
+,Nameless,,,
+Alan,Turing,,,"Likes ""machines"", codes"
+"""
+
+JSONL = b"""{"first_name": "Ada", "last_name": "Lovelace"}
+not json
+{"first_name": "Alan", "last_name": "Turing", "email": "alan@test.com"}
+"""
+
+VCARD = b"""BEGIN:VCARD
+VERSION:3.0
+N:Lovelace;Ada;;;
+FN:Ada Lovelace
+EMAIL;TYPE=home:ada@test.com
+TEL;TYPE=cell:1234567890
+NOTE:First programmer\\nand poet
+END:VCARD
+BEGIN:VCARD
+VERSION:3.0
+FN:Alan Turing
+END:VCARD
+"""
+
+
+class ContactBulkImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content, **params):
+        url = reverse('contact-bulk-import')
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_import_csv(self):
+        """
+        Valid CSV rows are created and invalid ones are reported by line.
+        """
+        response = self.upload('contacts.csv', CSV)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertIn('first_name', response.data['errors'][0]['errors'])
+        turing = Contact.objects.get(owner=self.user, last_name='Turing')
+        self.assertEqual(turing.notes, 'Likes "machines", codes')
+
+    @override_settings(CONTACTS_IMPORT_BATCH_SIZE=1)
+    def test_import_jsonl(self):
+        """
+        Unparseable JSON lines are reported without stopping the import.
+        """
+        response = self.upload('contacts.jsonl', JSONL)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertEqual(Contact.objects.filter(owner=self.user).count(), 2)
+
+    def test_import_vcard(self):
+        """
+        vCards are mapped onto contact fields.
+        """
+        response = self.upload('contacts.vcf', VCARD)
+        self.assertEqual(response.data['created'], 2)
+        ada = Contact.objects.get(owner=self.user, last_name='Lovelace')
+        self.assertEqual(ada.email, 'ada@test.com')
+        self.assertEqual(ada.phone, '1234567890')
+        self.assertEqual(ada.notes, 'First programmer\nand poet')
+        self.assertTrue(Contact.objects.filter(owner=self.user, first_name='Alan', last_name='Turing').exists())
+
+    def test_import_unknown_format(self):
+        """
+        A file whose format cannot be detected returns a 400 BAD REQUEST.
+        """
+        response = self.upload('contacts.txt', CSV)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload('contacts.txt', CSV, type='csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ContactExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        create_contact(first_name='Ada', last_name='Lovelace', email='ada@test.com', notes='Poet; "analyst"\nof engines', owner=self.user)
+        create_contact(first_name='Alan', last_name='Turing', phone='1234567890', owner=self.user)
+        create_contact(first_name='Not', last_name='Mine', owner=User.objects.create(username='not_test_user'))
+
+    def export(self, fmt):
+        response = self.client.get(reverse('contact-export'), {'type': fmt})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_export_csv(self):
+        """
+        Exporting CSV streams a header and the user's contacts only.
+        """
+        lines = self.export('csv').decode().splitlines()
+        self.assertEqual(lines[0], 'first_name,last_name,email,phone,notes')
+        self.assertEqual(len([line for line in lines if 'Mine' in line]), 0)
+        self.assertTrue(lines[-1].startswith('Alan,Turing'))
+
+    def test_export_round_trips(self):
+        """
+        Every export format can be imported again without losing fields.
+        """
+        fields = ['first_name', 'last_name', 'email', 'phone', 'notes']
+        expected = sorted(Contact.objects.filter(owner=self.user).values_list(*fields))
+        for fmt, name in [('csv', 'c.csv'), ('jsonl', 'c.jsonl'), ('vcard', 'c.vcf')]:
+            content = self.export(fmt)
+            importer = User.objects.create(username=f'import_{fmt}')
+            self.client.force_authenticate(user=importer)
+            response = self.client.post(
+                reverse('contact-bulk-import'), {'file': SimpleUploadedFile(name, content)}, format='multipart')
+            self.assertEqual(response.data['created'], 2, msg=fmt)
+            imported = sorted(Contact.objects.filter(owner=importer).values_list(*fields))
+            self.assertEqual(imported, expected, msg=fmt)
+            self.client.force_authenticate(user=self.user)
+
+    def test_export_unknown_format(self):
+        """
+        Asking for an unsupported format returns a 400 BAD REQUEST.
+        """
+        response = self.client.get(reverse('contact-export'), {'type': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ContactBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.contacts = [
+            create_contact(first_name=f'first{i}', last_name=f'last{i}', owner=self.user) for i in range(3)]
+
+    def batch(self, operations):
+        return self.client.post(reverse('contact-batch'), {'operations': operations}, format='json')
+
+    def test_update_and_delete(self):
+        """
+        Updates and deletes are applied and reported per operation.
+        """
+        first, second, third = self.contacts
+        response = self.batch([
+            {'op': 'update', 'id': first.id, 'data': {'first_name': 'renamed'}},
+            {'op': 'delete', 'id': second.id},
+            {'op': 'update', 'id': third.id, 'data': {'first_name': ''}},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [200, 204, 400])
+        self.assertEqual(results[0]['contact']['first_name'], 'renamed')
+        self.assertEqual(results[0]['contact']['last_name'], 'last0')
+        self.assertIn('first_name', results[2]['errors'])
+        self.assertEqual(Contact.objects.get(pk=first.id).first_name, 'renamed')
+        self.assertFalse(Contact.objects.filter(pk=second.id).exists())
+        self.assertEqual(Contact.objects.get(pk=third.id).first_name, 'first2')
+
+    def test_other_owners_contacts_not_found(self):
+        """
+        Operations on other users' contacts return a 404 and change nothing.
+        """
+        other = User.objects.create(username='not_test_user')
+        contact = create_contact(first_name='other', last_name='other', owner=other)
+        response = self.batch([{'op': 'delete', 'id': contact.id}])
+        self.assertEqual(response.data['results'], [{'id': contact.id, 'status': 404, 'errors': {'detail': 'Not found.'}}])
+        self.assertTrue(Contact.objects.filter(pk=contact.id).exists())
+
+    def test_constant_queries(self):
+        """
+        A batch costs the same number of queries however many contacts it touches.
+        """
+        operations = [{'op': 'delete', 'id': contact.id} for contact in self.contacts]
+        with self.assertNumQueries(8):
+            self.batch(operations[:1])
+        more = [create_contact(first_name='first', last_name='last', owner=self.user) for _ in range(5)]
+        operations = [{'op': 'update', 'id': contact.id, 'data': {'notes': 'x'}} for contact in more]
+        with self.assertNumQueries(8):
+            self.batch(operations + [{'op': 'delete', 'id': contact.id} for contact in self.contacts[1:]])
+
+    def test_changes_visible_to_sync(self):
+        """
+        Batched changes show up in the delta sync with their own revisions.
+        """
+        token = self.client.get(reverse('contact-changes'), {'since': 0}).json()['sync_token']
+        self.batch([
+            {'op': 'update', 'id': self.contacts[0].id, 'data': {'notes': 'x'}},
+            {'op': 'delete', 'id': self.contacts[1].id},
+        ])
+        data = self.client.get(reverse('contact-changes'), {'since': token}).json()
+        self.assertEqual([row['id'] for row in data['changed']], [self.contacts[0].id])
+        self.assertEqual(data['deleted'], [self.contacts[1].id])
+
+    def test_duplicate_ids(self):
+        """
+        Naming the same contact twice returns a 400 BAD REQUEST.
+        """
+        contact = self.contacts[0]
+        response = self.batch([{'op': 'delete', 'id': contact.id}, {'op': 'update', 'id': contact.id, 'data': {}}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
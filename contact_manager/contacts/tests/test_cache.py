@@ -0,0 +1,111 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.models import Contact
+from contacts.routers import ReplicaRouter, pinned_to_primary, read_from_replica
+from contacts.tests.test_contacts import create_contact
+
+
+@override_settings(CONTACTS_SHARED_CACHE=True)
+class ContactResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.contact = create_contact(first_name='first', last_name='last', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """
+        Listing twice without changes returns the same ETag without querying.
+        """
+        first = self.client.get(reverse('contact-list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('contact-list'))
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first.content, second.content)
+
+    def test_if_none_match_not_modified(self):
+        """
+        Sending back a current ETag returns a 304 NOT MODIFIED.
+        """
+        url = reverse('contact-detail', kwargs={'pk': self.contact.pk})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_invalidates_owner_only(self):
+        """
+        A write changes the owner's ETags but not those of other users.
+        """
+        other = User.objects.create(username='not_test_user')
+        create_contact(first_name='other', last_name='other', owner=other)
+        self.client.force_authenticate(user=other)
+        other_etag = self.client.get(reverse('contact-list'))['ETag']
+
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(reverse('contact-list'))['ETag']
+        create_contact(first_name='new', last_name='new', owner=self.user)
+        response = self.client.get(reverse('contact-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 2)
+
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('contact-list'), HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(CONTACTS_SHARED_CACHE=False)
+    def test_unshared_cache_not_reused(self):
+        """
+        Without a shared cache, writes another worker made are seen straight away.
+        """
+        etag = self.client.get(reverse('contact-list'))['ETag']
+        self.client.get(reverse('contact-search'), {'q': 'first'})
+        # A queryset update bumps no version here, like a write in another process.
+        Contact.objects.filter(pk=self.contact.pk).update(first_name='renamed')
+        response = self.client.get(reverse('contact-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][0]['first_name'], 'renamed')
+        response = self.client.get(reverse('contact-search'), {'q': 'renamed'})
+        self.assertEqual([contact['id'] for contact in response.json()['results']], [self.contact.pk])
+        response = self.client.get(reverse('contact-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ReplicaRouterTests(APITestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.user = User.objects.create(username='test_user')
+
+    def test_primary_without_replicas(self):
+        """
+        Without replicas every read goes to the primary.
+        """
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Contact), 'default')
+
+    @override_settings(CONTACTS_READ_REPLICAS=['replica_0', 'replica_1'])
+    def test_replica_reads_scoped(self):
+        """
+        Only reads made under read_from_replica go to a replica; writes never do.
+        """
+        self.assertEqual(self.router.db_for_read(Contact), 'default')
+        with read_from_replica():
+            self.assertIn(self.router.db_for_read(Contact), ['replica_0', 'replica_1'])
+            self.assertEqual(self.router.db_for_write(Contact), 'default')
+        self.assertEqual(self.router.db_for_read(Contact), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_0', 'contacts'))
+
+    @override_settings(CONTACTS_READ_REPLICAS=['replica_0'])
+    def test_pinned_after_write(self):
+        """
+        An owner's reads stay on the primary right after they change a contact.
+        """
+        cache.clear()
+        self.assertFalse(pinned_to_primary(self.user.id))
+        create_contact(first_name='first', last_name='last', owner=self.user)
+        self.assertTrue(pinned_to_primary(self.user.id))
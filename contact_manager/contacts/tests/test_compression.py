@@ -0,0 +1,188 @@
+import gzip
+import json
+import logging
+import unittest
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.compression import brotli, choose_encoding, parse_accept_encoding
+from contacts.middleware import CompressionMiddleware
+from contacts.renderers import columnar, msgpack
+from contacts.tests.test_contacts import create_contact
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_parse_quality_values(self):
+        """
+        Codings are read with their quality values, defaulting to 1.
+        """
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.5, br , identity;q=0, deflate;q=x'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0, 'deflate': 0.0})
+
+    def test_choose_encoding(self):
+        """
+        The client's preferred supported coding wins; refused and unknown codings are never picked.
+        """
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('deflate, identity'))
+        self.assertIsNone(choose_encoding('gzip;q=0'))
+        self.assertIsNone(choose_encoding(''))
+        self.assertEqual(choose_encoding('*'), 'br' if brotli is not None else 'gzip')
+        self.assertEqual(choose_encoding('br;q=0.1, gzip'), 'gzip')
+
+
+class CompressionMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        for i in range(30):
+            create_contact(first_name=f'first{i}', last_name=f'last{i:02d}', owner=self.user, notes='Met at a conference.')
+
+    def test_gzip_list(self):
+        """
+        A large listing is gzipped for clients that accept it, and decompresses to the same JSON.
+        """
+        plain = self.client.get(reverse('contact-list'))
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+
+    def test_weak_etag_revalidates(self):
+        """
+        Sending back the weak ETag of a compressed response gets a 304 NOT MODIFIED.
+        """
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT_ENCODING='gzip')
+        response = self.client.get(
+            reverse('contact-list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_accepted(self):
+        """
+        Clients that do not accept a supported coding get the response as it is.
+        """
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(CONTACTS_COMPRESSION_MIN_SIZE=100000)
+    def test_small_response(self):
+        """
+        Responses under the size threshold are not compressed.
+        """
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_export(self):
+        """
+        Streamed exports are compressed as they are sent.
+        """
+        response = self.client.get(reverse('contact-export'), {'type': 'csv'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(content.count('conference'), 30)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_list(self):
+        """
+        Clients preferring brotli get the listing brotli compressed.
+        """
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT_ENCODING='gzip;q=0.5, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))['results']), 30)
+
+
+class AsyncCompressionMiddlewareTests(SimpleTestCase):
+    async def test_async_response(self):
+        """
+        In an async chain the middleware is a coroutine and compresses the awaited response.
+        """
+        async def get_response(request):
+            return HttpResponse(b'x' * 2000)
+
+        middleware = CompressionMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'x' * 2000)
+
+    def test_asgi_chain_not_adapted(self):
+        """
+        Under ASGI the middleware does not force the chain through sync_to_async.
+        """
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            ASGIHandler().load_middleware(is_async=True)
+            logging.getLogger('django.request').debug('Middleware loaded.')
+        self.assertFalse([line for line in logs.output if 'adapted for middleware contacts.middleware' in line])
+
+
+class CompactRendererTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        for i in range(3):
+            create_contact(first_name=f'first{i}', last_name=f'last{i}', owner=self.user)
+
+    def test_columnar(self):
+        """
+        Lists of objects become column names and rows; anything else is left alone.
+        """
+        self.assertEqual(
+            columnar({'next': None, 'results': [{'a': 1, 'b': 2}, {'a': 3, 'c': 4}]}),
+            {'next': None, 'results': {'columns': ['a', 'b', 'c'], 'rows': [[1, 2, None], [3, None, 4]]}})
+        self.assertEqual(columnar({'detail': 'Not found.'}), {'detail': 'Not found.'})
+        self.assertEqual(columnar([]), {'columns': [], 'rows': []})
+
+    def test_columnar_list(self):
+        """
+        Asking for columnar JSON returns the same page with each key sent once.
+        """
+        plain = self.client.get(reverse('contact-list')).json()
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT='application/vnd.contacts.columnar+json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.contacts.columnar+json')
+        data = json.loads(response.content)
+        self.assertEqual(data['results']['columns'], list(plain['results'][0]))
+        self.assertEqual(
+            [dict(zip(data['results']['columns'], row)) for row in data['results']['rows']], plain['results'])
+
+    def test_indented_json(self):
+        """
+        Asking for indented JSON returns the same page, indented like DRF's JSONRenderer.
+        """
+        plain = self.client.get(reverse('contact-list'))
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT='application/json; indent=4')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), json.loads(plain.content))
+        self.assertIn(b'\n    "results": [', response.content)
+        self.assertNotIn(b'\n', plain.content)
+
+    def test_columnar_errors(self):
+        """
+        Errors are rendered as plain JSON objects in columnar responses too.
+        """
+        response = self.client.get(
+            reverse('contact-list'), {'fields': 'nope'}, HTTP_ACCEPT='application/vnd.contacts.columnar+json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', json.loads(response.content))
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_list(self):
+        """
+        Asking for MessagePack returns the same page, MessagePack encoded.
+        """
+        plain = self.client.get(reverse('contact-list')).json()
+        response = self.client.get(reverse('contact-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), plain)
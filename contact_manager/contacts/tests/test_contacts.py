@@ -6,8 +6,11 @@ from django.test import TestCase
 from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
 
 from contacts.models import Contact
+from contacts.serializers import ContactSerializer
 
 
 def create_contact(first_name: str, last_name: str, owner: User, email: str='', phone: str='', notes: str='') -> Contact:
@@ -96,6 +99,93 @@ class ContactListViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)        
 
 
+class ContactListPaginationTests(APITestCase):
+    def test_cursor_pagination(self):
+        """
+        Following the next links walks every contact once in last name order.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        for last_name in ['c', 'a', 'b', 'a', 'd']:
+            create_contact(first_name='first', last_name=last_name, owner=user)
+        seen = []
+        url = reverse('contact-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend((row['last_name'], row['id']) for row in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 5)
+
+    def test_cursor_within_same_last_name(self):
+        """
+        Pages inside a run of one last name follow (last_name, id) and do not shift when earlier rows go.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        ids = [create_contact(first_name='first', last_name='Smith', owner=user).id for _ in range(5)]
+        first = self.client.get(reverse('contact-list') + '?page_size=2').json()
+        self.assertEqual([row['id'] for row in first['results']], ids[:2])
+        Contact.objects.get(pk=ids[0]).delete()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['id'] for row in second['results']], ids[2:4])
+
+    def test_cursor_previous(self):
+        """
+        Following the previous links walks back over the same pages.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        for last_name in ['c', 'a', 'b', 'a', 'd']:
+            create_contact(first_name='first', last_name=last_name, owner=user)
+        pages = []
+        url = reverse('contact-list') + '?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            pages.append([row['id'] for row in data['results']])
+            url = data['next']
+        self.assertIsNone(self.client.get(reverse('contact-list') + '?page_size=2').json()['previous'])
+        back = []
+        url = data['previous']
+        while url:
+            data = self.client.get(url).json()
+            back.append([row['id'] for row in data['results']])
+            url = data['previous']
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_invalid_cursor(self):
+        """
+        A cursor that cannot be decoded returns a 404 NOT FOUND.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('contact-list'), {'cursor': 'cD1ub3Rqc29u'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fields_projection(self):
+        """
+        Requesting fields renders only those fields.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        create_contact(first_name='first', last_name='last', notes='long notes', owner=user)
+        response = self.client.get(reverse('contact-list'), {'fields': 'id,first_name,owner'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['results'][0],
+            {'owner': 'test_user', 'id': response.json()['results'][0]['id'], 'first_name': 'first'})
+
+    def test_fields_projection_unknown(self):
+        """
+        Requesting a field that does not exist returns a 400 BAD REQUEST.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('contact-list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ContactDetailViewTests(TestCase):
     def test_contact_exists(self):
         """
@@ -149,7 +239,7 @@ class ContactDetailViewTests(TestCase):
 
     def test_contact_updatable_not_owned(self):
         """
-        Attempting to update a contact not owned returns a 403 FORBIDDEN.
+        Attempting to update a contact not owned returns a 404 NOT FOUND.
         """
         not_user = User.objects.create(username='not_test_user')
         user = User.objects.create(username='test_user')
@@ -168,7 +258,7 @@ class ContactDetailViewTests(TestCase):
             reverse('contact-detail', kwargs={'pk': contact.pk}),
             data=(update_contact),
             content_type='application/json')
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_contact_delete(self):
         """
@@ -187,7 +277,7 @@ class ContactDetailViewTests(TestCase):
 
     def test_contact_delete_not_owned(self):
         """
-        Attempting to delete a contact not owned returns a 403 FORBIDDEN.
+        Attempting to delete a contact not owned returns a 404 NOT FOUND.
         """
         not_user = User.objects.create(username='not_test_user')
         user = User.objects.create(username='test_user')
@@ -199,4 +289,59 @@ class ContactDetailViewTests(TestCase):
         response = self.client.delete(
             reverse('contact-detail', kwargs={'pk': contact.pk}),
             content_type='application/json')
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ContactQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.contact = create_contact(first_name='first', last_name='last', owner=self.user)
+
+    def test_detail_single_query(self):
+        """
+        Reading a contact, owner included, takes a single query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('contact-detail', kwargs={'pk': self.contact.pk}))
+        self.assertEqual(response.data['owner'], 'test_user')
+
+    def test_detail_not_owned_single_query(self):
+        """
+        Looking up another user's contact takes a single query and returns a 404 NOT FOUND.
+        """
+        contact = create_contact(first_name='first', last_name='last', owner=User.objects.create(username='not_test_user'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('contact-detail', kwargs={'pk': contact.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_query_count_constant(self):
+        """
+        Listing contacts takes the same number of queries however many there are.
+        """
+        for i in range(20):
+            create_contact(first_name='first', last_name=f'last{i}', owner=self.user)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('contact-list'))
+
+
+class ContactListFastPathTests(APITestCase):
+    def test_matches_serializer_output(self):
+        """
+        The JSON listing is byte for byte what ContactSerializer and JSONRenderer produce.
+        """
+        user = User.objects.create(username='tëst_user')
+        self.client.force_authenticate(user=user)
+        create_contact(first_name='Zoë', last_name='O"Brien', notes='line\nbreak   \U0001F600 \x01', owner=user)
+        create_contact(first_name='plain', last_name='contact', email='a@b.c', phone='123', owner=user)
+        for params in [{}, {'fields': 'notes,owner,id'}, {'page_size': 1}]:
+            response = self.client.get(reverse('contact-list'), params)
+            data = response.json()
+            contacts = Contact.objects.filter(owner=user).order_by('last_name', 'id')[:len(data['results'])]
+            fields = params['fields'].split(',') if 'fields' in params else None
+            expected = JSONRenderer().render({
+                'next': data['next'],
+                'previous': data['previous'],
+                'results': ContactSerializer(contacts, many=True, fields=fields).data,
+            })
+            self.assertEqual(response.content, expected, msg=params)
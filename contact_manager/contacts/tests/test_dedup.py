@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.dedup import candidate_pairs, find_clusters, soundex
+from contacts.models import Contact
+from contacts.normalize import normalize_email, normalize_phone
+from contacts.tests.test_contacts import create_contact
+
+
+def row(pk, first_name, last_name, email='', phone=''):
+    return {
+        'id': pk, 'first_name': first_name, 'last_name': last_name,
+        'email_normalized': normalize_email(email), 'phone_normalized': normalize_phone(phone),
+    }
+
+
+class DedupScoringTests(TestCase):
+    def test_soundex(self):
+        """
+        Spelling variants of a surname share a Soundex code.
+        """
+        self.assertEqual(soundex('Smith'), soundex('Smyth'))
+        self.assertEqual(soundex('Robert'), 'R163')
+        self.assertEqual(soundex('Pfister'), 'P236')
+        self.assertNotEqual(soundex('Smith'), soundex('Jones'))
+
+    def test_clusters(self):
+        """
+        Similar names and shared identifiers are grouped; unrelated contacts are not.
+        """
+        rows = [
+            row(1, 'Jon', 'Smith', phone='555-123-4567'),
+            row(2, 'John', 'Smyth', phone='(555) 123 4567'),
+            row(3, 'Ada', 'Lovelace', email='ada@test.com'),
+            row(4, 'Ada', 'Lovelace', email='ADA@test.com'),
+            row(5, 'Alan', 'Turing'),
+            row(6, 'Grace', 'Hopper', email='shared@test.com'),
+            row(7, 'Linus', 'Torvalds', email='shared@test.com'),
+        ]
+        clusters = find_clusters(rows, threshold=0.85)
+        self.assertEqual(sorted(cluster['ids'] for cluster in clusters), [[1, 2], [3, 4]])
+        self.assertEqual(clusters[0]['score'], 1.0)
+
+    def test_blocking_window(self):
+        """
+        A huge block only compares each contact with a window of neighbours.
+        """
+        rows = [row(i, 'Pat', f'Smith{i:04d}') for i in range(500)]
+        self.assertLessEqual(len(list(candidate_pairs(rows, window=5))), 500 * 5)
+
+
+class ContactDuplicatesTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.primary = create_contact(
+            first_name='Ada', last_name='Lovelace', email='ada@test.com', notes='Met at a ball.', owner=self.user)
+        self.duplicate = create_contact(
+            first_name='Ada', last_name='Lovelace', phone='1234567890', notes='Likes engines.', owner=self.user)
+        create_contact(first_name='Alan', last_name='Turing', owner=self.user)
+
+    def test_list_clusters(self):
+        """
+        Listing duplicates returns each cluster with its contacts.
+        """
+        response = self.client.get(reverse('contact-duplicates'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        clusters = response.data['results']
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual([contact['id'] for contact in clusters[0]['contacts']], [self.primary.id, self.duplicate.id])
+
+    def test_merge(self):
+        """
+        Merging fills empty fields, consolidates notes and deletes the duplicates.
+        """
+        response = self.client.post(
+            reverse('contact-merge'), {'primary': self.primary.id, 'duplicates': [self.duplicate.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['phone'], '1234567890')
+        self.assertEqual(response.data['notes'], 'Met at a ball.\n\nLikes engines.')
+        self.assertFalse(Contact.objects.filter(pk=self.duplicate.id).exists())
+        self.assertEqual(self.client.get(reverse('contact-duplicates')).data['results'], [])
+
+    def test_merge_not_owned(self):
+        """
+        Merging another user's contact returns a 404 NOT FOUND and changes nothing.
+        """
+        other = create_contact(first_name='Ada', last_name='Lovelace', owner=User.objects.create(username='other'))
+        response = self.client.post(
+            reverse('contact-merge'), {'primary': self.primary.id, 'duplicates': [other.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Contact.objects.filter(pk=other.id).exists())
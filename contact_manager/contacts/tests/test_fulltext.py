@@ -0,0 +1,118 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.fulltext import make_snippet
+from contacts.tests.test_contacts import create_contact
+
+
+class SnippetTests(TestCase):
+    def test_highlights_and_escapes(self):
+        """
+        Matching words are marked and the rest of the notes is HTML escaped.
+        """
+        snippet = make_snippet('Builds <b>analytical</b> engines', ['engines'])
+        self.assertEqual(snippet, 'Builds &lt;b&gt;analytical&lt;/b&gt; <mark>engines</mark>')
+
+    def test_centered_on_match(self):
+        """
+        Long notes are cut down to a window around the first match.
+        """
+        text = 'filler ' * 100 + 'the analytical engine ' + 'filler ' * 100
+        snippet = make_snippet(text, ['engine'], width=60)
+        self.assertIn('<mark>engine</mark>', snippet)
+        self.assertTrue(snippet.startswith('…') and snippet.endswith('…'))
+        self.assertLess(len(snippet), 100)
+
+
+class FullTextSchemaTests(TestCase):
+    def test_sqlite_triggers_survive_migrations(self):
+        """
+        No later migration rebuilt contacts_contact on SQLite and dropped the FTS triggers.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only.')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_contact_fts'")
+            if cursor.fetchone() is None:
+                self.skipTest('SQLite was built without FTS5.')
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'contacts_contact'")
+            triggers = {name for name, in cursor.fetchall()}
+        self.assertEqual(triggers, {
+            'contacts_contact_fts_insert', 'contacts_contact_fts_delete', 'contacts_contact_fts_update'})
+
+
+class ContactFullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.engineer = create_contact(
+            first_name='Ada', last_name='Lovelace', notes='Wrote programs for the analytical engine.', owner=self.user)
+        self.mathematician = create_contact(
+            first_name='Charles', last_name='Engine', notes='Mathematician.', owner=self.user)
+        create_contact(first_name='Alan', last_name='Turing', notes='Broke ciphers.', owner=self.user)
+        other = User.objects.create(username='not_test_user')
+        create_contact(first_name='other', last_name='other', notes='Also likes engines.', owner=other)
+
+    def search(self, q, **params):
+        return self.client.get(reverse('contact-fulltext-search'), {'q': q, **params})
+
+    def test_search_notes(self):
+        """
+        Words in notes are found, stemmed, with a rank and a snippet.
+        """
+        response = self.search('program')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['id'] for result in results], [self.engineer.id])
+        self.assertIn('<mark>programs</mark>', results[0]['snippet'])
+        self.assertGreater(results[0]['rank'], 0)
+
+    def test_names_rank_above_notes(self):
+        """
+        A match in a name ranks above a match in notes.
+        """
+        results = self.search('engine').data['results']
+        self.assertEqual([result['id'] for result in results], [self.mathematician.id, self.engineer.id])
+
+    def test_all_words_required(self):
+        """
+        Every word of the query must match.
+        """
+        self.assertEqual(self.search('analytical ciphers').data['count'], 0)
+        self.assertEqual(self.search('analytical engine').data['count'], 1)
+
+    def test_operators_ignored(self):
+        """
+        Search operators in the query are treated as plain words.
+        """
+        response = self.search('engine" OR NEAR(')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_contacts_excluded(self):
+        """
+        Deleted contacts are not found.
+        """
+        self.engineer.delete()
+        self.assertEqual(self.search('program').data['count'], 0)
+
+    def test_updates_reindexed(self):
+        """
+        Edited notes are searchable right away.
+        """
+        self.engineer.notes = 'Poetical science.'
+        self.engineer.save()
+        self.assertEqual(self.search('program').data['count'], 0)
+        self.assertEqual(self.search('poetical').data['count'], 1)
+
+    def test_pagination(self):
+        """
+        Results are paginated.
+        """
+        response = self.search('engine', page_size=1)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
@@ -0,0 +1,108 @@
+import logging
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.instrumentation import registry
+from contacts.middleware import InstrumentationMiddleware
+from contacts.tests.test_contacts import create_contact
+
+
+@override_settings(CONTACTS_INSTRUMENTATION=True, CONTACTS_SHARED_CACHE=True)
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = User.objects.create(username='test_user')
+        create_contact(first_name='first', last_name='last', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header(self):
+        """
+        Instrumented responses report wall, database and serialization time.
+        """
+        response = self.client.get(reverse('contact-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response['Server-Timing']
+        self.assertTrue(timing.startswith('total;dur='))
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('cache_miss;desc="1"', timing)
+
+    def test_cache_hits_counted(self):
+        """
+        A response served from the response cache is reported as a cache hit.
+        """
+        self.client.get(reverse('contact-list'))
+        response = self.client.get(reverse('contact-list'))
+        self.assertIn('cache_hit;desc="1"', response['Server-Timing'])
+        self.assertNotIn('db;', response['Server-Timing'])
+
+    def test_metrics_endpoint(self):
+        """
+        /metrics exposes aggregated request counts, durations and phases.
+        """
+        self.client.get(reverse('contact-list'))
+        self.client.get(reverse('contact-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('contacts_http_requests_total{view="contact-list",method="GET",status="200"} 2', body)
+        self.assertIn('contacts_http_request_duration_seconds_count{view="contact-list",method="GET"} 2', body)
+        self.assertIn('contacts_events_total{event="cache_hit",view="contact-list",method="GET"} 1', body)
+        self.assertIn('contacts_phase_seconds_total{phase="db",view="contact-list",method="GET"}', body)
+
+    def test_profile_sampling(self):
+        """
+        Every CONTACTS_PROFILE_SAMPLE_RATE-th request is dumped as a cProfile file.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(CONTACTS_PROFILE_SAMPLE_RATE=2, CONTACTS_PROFILE_DIR=directory):
+                self.client.handler.load_middleware()
+                for _ in range(4):
+                    self.client.get(reverse('contact-list'))
+            self.assertEqual(len(list(Path(directory).glob('*.prof'))), 2)
+
+
+@override_settings(CONTACTS_INSTRUMENTATION=True)
+class AsyncInstrumentationTests(SimpleTestCase):
+    async def test_async_response(self):
+        """
+        In an async chain the middleware is a coroutine and times the awaited response.
+        """
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        middleware = InstrumentationMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/'))
+        self.assertTrue(response['Server-Timing'].startswith('total;dur='))
+
+    def test_asgi_chain_not_adapted(self):
+        """
+        Under ASGI the contacts middleware does not force the chain through sync_to_async.
+        """
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            ASGIHandler().load_middleware(is_async=True)
+            logging.getLogger('django.request').debug('Middleware loaded.')
+        self.assertFalse([line for line in logs.output if 'adapted for middleware contacts.middleware' in line])
+
+
+class InstrumentationDisabledTests(APITestCase):
+    def test_disabled_by_default(self):
+        """
+        Without CONTACTS_INSTRUMENTATION there is no header and /metrics is a 404.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('contact-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
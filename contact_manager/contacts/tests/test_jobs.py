@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.jobs import JOB_KINDS, enqueue, job_kind, recover_stale, run_job
+from contacts.models import Contact, Job
+from contacts.tests.test_contacts import create_contact
+
+
+def run_jobs():
+    call_command('run_jobs', processes=0, once=True, stdout=StringIO())
+
+
+class JobEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+
+    def test_queue_job(self):
+        """
+        Queueing a job returns a 202 ACCEPTED with the job to poll.
+        """
+        response = self.client.post(reverse('job-list'), {'kind': 'find_duplicates'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+        self.assertEqual(response['Location'], response.data['url'])
+
+    def test_queue_private_kind(self):
+        """
+        Kinds of job that are not public cannot be queued through the API.
+        """
+        for kind in ('import_contacts', 'missing'):
+            response = self.client.post(reverse('job-list'), {'kind': kind}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_result(self):
+        """
+        A job run by the worker ends with its result.
+        """
+        create_contact(first_name='Jon', last_name='Smith', owner=self.user, phone='555-123-4567')
+        create_contact(first_name='John', last_name='Smith', owner=self.user, phone='(555) 123 4567')
+        job = enqueue(self.user, 'find_duplicates')
+        run_jobs()
+        response = self.client.get(reverse('job-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.SUCCEEDED)
+        self.assertEqual(response.data['attempts'], 1)
+        self.assertEqual(len(response.data['result']['clusters']), 1)
+
+    def test_list_own_jobs(self):
+        """
+        Users only see their own jobs, newest first.
+        """
+        other = User.objects.create(username='other_user')
+        enqueue(other, 'find_duplicates')
+        first = enqueue(self.user, 'find_duplicates')
+        second = enqueue(self.user, 'find_duplicates')
+        response = self.client.get(reverse('job-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['id'] for job in response.data['results']], [second.pk, first.pk])
+
+    def test_other_users_job(self):
+        """
+        Reading or cancelling another user's job returns a 404 NOT FOUND.
+        """
+        job = enqueue(User.objects.create(username='other_user'), 'find_duplicates')
+        response = self.client.get(reverse('job-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('job-cancel', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_queued_job(self):
+        """
+        Cancelling a queued job cancels it before any worker picks it up.
+        """
+        job = enqueue(self.user, 'find_duplicates')
+        response = self.client.post(reverse('job-cancel', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.CANCELLED)
+        run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.CANCELLED)
+        self.assertEqual(job.attempts, 0)
+
+    def test_cancel_finished_job(self):
+        """
+        Cancelling a finished job returns a 409 CONFLICT.
+        """
+        job = enqueue(self.user, 'find_duplicates')
+        run_jobs()
+        response = self.client.post(reverse('job-cancel', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+
+class BackgroundImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_background_import(self):
+        """
+        A background import returns a 202 ACCEPTED and the job imports the file.
+        """
+        upload = SimpleUploadedFile('contacts.csv', b'first_name,last_name\nAda,Lovelace\n,Nameless\n')
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.post(
+                reverse('contact-bulk-import') + '?background=true', {'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertFalse(Contact.objects.exists())
+            run_jobs()
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['created'], 1)
+        self.assertEqual(job.result['failed'], 1)
+        self.assertEqual(job.progress, 2)
+        self.assertTrue(Contact.objects.filter(owner=self.user, last_name='Lovelace').exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, job.params['path'])))
+
+
+class RunJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.calls = 0
+
+        def flaky(context):
+            self.calls += 1
+            raise RuntimeError('database went away')
+
+        def cancellable(context):
+            Job.objects.filter(pk=context.job.pk).update(cancel_requested=True)
+            context.progress(1, 2)
+            return {'finished': True}
+
+        job_kind('test_flaky', max_attempts=2)(flaky)
+        job_kind('test_cancellable')(cancellable)
+        self.addCleanup(JOB_KINDS.pop, 'test_flaky')
+        self.addCleanup(JOB_KINDS.pop, 'test_cancellable')
+
+    def test_retry_then_fail(self):
+        """
+        A failing job is queued again with a delay until it runs out of attempts.
+        """
+        job = enqueue(self.user, 'test_flaky')
+        self.assertEqual(Job.objects.claim(), job)
+        with self.assertLogs('contacts.jobs', 'ERROR'):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('database went away', job.error)
+        self.assertIsNone(Job.objects.claim())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('contacts.jobs', 'ERROR'):
+            run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.calls, 2)
+        self.assertIsNotNone(job.finished)
+
+    def test_cancel_running_job(self):
+        """
+        A running job stops at the first progress report after it was cancelled.
+        """
+        job = enqueue(self.user, 'test_cancellable')
+        run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.CANCELLED)
+        self.assertEqual(job.progress, 1)
+        self.assertIsNone(job.result)
+
+    def test_claim_once(self):
+        """
+        A job can only be claimed by one worker.
+        """
+        job = enqueue(self.user, 'find_duplicates')
+        self.assertEqual(Job.objects.claim(), job)
+        self.assertIsNone(Job.objects.claim())
+
+    def test_recover_stale(self):
+        """
+        Running jobs without a recent heartbeat are queued again, or failed once out of attempts.
+        """
+        retried = enqueue(self.user, 'test_flaky')
+        exhausted = enqueue(self.user, 'find_duplicates')
+        Job.objects.update(
+            status=Job.RUNNING, attempts=1, heartbeat=timezone.now() - timedelta(hours=1))
+        Job.objects.filter(pk=exhausted.pk).update(attempts=3)
+        self.assertEqual(recover_stale(), 2)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, Job.QUEUED)
+        self.assertEqual(exhausted.status, Job.FAILED)
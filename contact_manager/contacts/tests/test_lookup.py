@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts import normalize
+from contacts.models import Contact
+from contacts.tests.test_contacts import create_contact
+
+
+class NormalizeTests(TestCase):
+    def test_phone_formats(self):
+        """
+        Formatting, national and international forms of a number normalize alike.
+        """
+        for phone in ['(555) 123-4567', '555.123.4567', '+1 555 123 4567', '1-555-123-4567', '001 555 123 4567']:
+            self.assertEqual(normalize.normalize_phone(phone), '+15551234567', msg=phone)
+
+    def test_unrecognisable_phone(self):
+        """
+        Numbers that cannot be made E.164 normalize to an empty string.
+        """
+        for phone in ['', '12345', 'call me']:
+            self.assertEqual(normalize.normalize_phone(phone), '', msg=phone)
+
+    def test_email(self):
+        """
+        Emails are trimmed and lowercased.
+        """
+        self.assertEqual(normalize.normalize_email(' Ada@Test.COM '), 'ada@test.com')
+
+
+class ContactLookupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.contact = create_contact(
+            first_name='Ada', last_name='Lovelace', email='Ada@Test.com', phone='(555) 123-4567', owner=self.user)
+        other = User.objects.create(username='not_test_user')
+        create_contact(first_name='other', last_name='other', phone='5551234567', owner=other)
+
+    def test_lookup_by_phone(self):
+        """
+        Any formatting of a stored number finds the owner's contact only.
+        """
+        response = self.client.get(reverse('contact-lookup'), {'phone': '+1 555 123 4567'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([contact['id'] for contact in response.data], [self.contact.id])
+
+    def test_lookup_by_email(self):
+        """
+        Email lookups ignore case.
+        """
+        response = self.client.get(reverse('contact-lookup'), {'email': 'ADA@test.com'})
+        self.assertEqual([contact['id'] for contact in response.data], [self.contact.id])
+
+    def test_lookup_follows_updates(self):
+        """
+        Changing a phone through the batch endpoint updates its normalized form.
+        """
+        self.client.post(reverse('contact-batch'), {'operations': [
+            {'op': 'update', 'id': self.contact.id, 'data': {'phone': '555-999-0000'}}]}, format='json')
+        response = self.client.get(reverse('contact-lookup'), {'phone': '5559990000'})
+        self.assertEqual([contact['id'] for contact in response.data], [self.contact.id])
+
+    def test_bad_lookup(self):
+        """
+        A missing or unrecognisable lookup returns a 400 BAD REQUEST.
+        """
+        self.assertEqual(self.client.get(reverse('contact-lookup')).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('contact-lookup'), {'phone': '123'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BackfillNormalizedTests(APITestCase):
+    def test_backfill(self):
+        """
+        The backfill fills in rows written before the normalized columns existed.
+        """
+        user = User.objects.create(username='test_user')
+        contacts = [
+            create_contact(first_name='first', last_name=f'last{i}', email=f'A{i}@Test.com', phone=f'555123456{i}', owner=user)
+            for i in range(5)
+        ]
+        Contact.all_objects.update(email_normalized='', phone_normalized='')
+        out = StringIO()
+        call_command('backfill_normalized', chunk_size=2, stdout=out)
+        self.assertIn('updated 5 of 5', out.getvalue())
+        contact = Contact.objects.get(pk=contacts[3].pk)
+        self.assertEqual((contact.email_normalized, contact.phone_normalized), ('a3@test.com', '+15551234563'))
+
+    def test_backfill_invalidates_cache(self):
+        """
+        Cached lookups of the backfilled owners are refreshed after the backfill.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        contact = create_contact(first_name='first', last_name='last', email='Ada@Test.com', owner=user)
+        Contact.all_objects.update(email_normalized='')
+        response = self.client.get(reverse('contact-lookup'), {'email': 'ada@test.com'})
+        self.assertEqual(response.json(), [])
+        call_command('backfill_normalized', stdout=StringIO())
+        response = self.client.get(reverse('contact-lookup'), {'email': 'ada@test.com'})
+        self.assertEqual([c['id'] for c in response.json()], [contact.id])
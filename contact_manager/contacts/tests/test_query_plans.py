@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from contacts.models import Contact, ContactTag, Tag
+from contacts.tests.test_contacts import create_contact
+
+
+def explain(sql: str, params=()) -> str:
+    """
+    Return the query plan of a statement as one string.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables always favour a sequential scan, so rule it out to
+            # learn whether an index could serve the query at all.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+class QueryPlanTests(APITestCase):
+    """
+    The hot contact queries must be answered from an index without sorting.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        other = User.objects.create(username='not_test_user')
+        for i in range(20):
+            create_contact(first_name=f'first{i}', last_name=f'last{i % 7}', owner=self.user)
+            create_contact(first_name=f'first{i}', last_name=f'last{i % 5}', owner=other)
+        self.client.force_authenticate(user=self.user)
+
+    def contact_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        queries = [query['sql'] for query in context.captured_queries]
+        table = Contact._meta.db_table
+        return [sql for sql in queries if sql.lstrip().upper().startswith('SELECT') and table in sql]
+
+    def assertIndexedWithoutSort(self, sql, params=()):
+        plan = explain(sql, params)
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan, msg=plan)
+            self.assertNotIn('Sort', plan, msg=plan)
+        else:
+            self.assertNotRegex(plan, r'\bSCAN contacts_contact\b', msg=plan)
+            self.assertNotIn('TEMP B-TREE', plan, msg=plan)
+
+    def test_contact_list_plans(self):
+        """
+        Every page of the contact list is an ordered index range scan.
+        """
+        response = self.client.get(reverse('contact-list') + '?page_size=5')
+        queries = self.contact_queries(response.json()['next'])
+        queries += self.contact_queries(reverse('contact-list') + '?page_size=5')
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertIndexedWithoutSort(sql)
+
+    def test_contact_detail_plan(self):
+        """
+        Reading a contact is a primary key lookup.
+        """
+        contact = Contact.objects.filter(owner=self.user).first()
+        queries = self.contact_queries(reverse('contact-detail', kwargs={'pk': contact.pk}))
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertIndexedWithoutSort(sql)
+
+    def test_email_and_phone_lookup_plans(self):
+        """
+        Looking a contact up by email or phone within an address book uses an index.
+        """
+        for lookup in ({'email_normalized': 'someone@test.com'}, {'phone_normalized': '+11234567890'}):
+            queryset = Contact.objects.filter(owner=self.user, **lookup).values('id', 'first_name', 'last_name')
+            self.assertIndexedWithoutSort(*queryset.query.sql_with_params())
+
+    def test_tag_filter_plan(self):
+        """
+        Listing a tag's contacts joins through the membership index without scanning either table.
+        """
+        tag = Tag.objects.create(owner=self.user, name='work')
+        for contact in Contact.objects.filter(owner=self.user)[:5]:
+            ContactTag.objects.create(owner=self.user, tag=tag, contact=contact)
+        queries = self.contact_queries(reverse('contact-list') + f'?tag={tag.pk}')
+        self.assertTrue(queries)
+        for sql in queries:
+            plan = explain(sql)
+            if connection.vendor == 'postgresql':
+                self.assertNotIn('Seq Scan', plan, msg=plan)
+            else:
+                self.assertNotRegex(plan, r'\bSCAN (contacts_contact|contacts_contacttag)\b', msg=plan)
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.search import NameIndex, prefix_distance
+from contacts.tests.test_contacts import create_contact
+
+
+class NameIndexTests(SimpleTestCase):
+    def test_prefix_distance(self):
+        """
+        A query is compared against the closest prefix of the name.
+        """
+        self.assertEqual(prefix_distance('joh', 'johnson', 2), 0)
+        self.assertEqual(prefix_distance('jhon', 'john', 2), 2)
+        self.assertEqual(prefix_distance('zzzz', 'john', 1), 2)
+
+    def test_search_ranks_closest_first(self):
+        """
+        Exact prefixes rank ahead of typos, and unrelated names are left out.
+        """
+        index = NameIndex([
+            (1, 'Jon', 'Smyth'),
+            (2, 'John', 'Smith'),
+            (3, 'Alice', 'Walker'),
+        ])
+        self.assertEqual(index.search('smith'), [2, 1])
+        self.assertEqual(index.search('john smi'), [2])
+        self.assertEqual(index.search(''), [])
+
+
+class ContactSearchViewTests(APITestCase):
+    def test_search_own_contacts(self):
+        """
+        Searching returns a 200 OK with only the user's ranked matches.
+        """
+        user = User.objects.create(username='test_user')
+        not_user = User.objects.create(username='not_test_user')
+        create_contact(first_name='John', last_name='Smith', owner=user)
+        create_contact(first_name='Jane', last_name='Doe', owner=user)
+        create_contact(first_name='John', last_name='Smith', owner=not_user)
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('contact-search'), {'q': 'jonh'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['last_name'], 'Smith')
+
+    def test_search_sees_new_contacts(self):
+        """
+        A contact created after a search shows up in the next one.
+        """
+        user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse('contact-search'), {'q': 'doe'})
+        create_contact(first_name='Jane', last_name='Doe', owner=user)
+        response = self.client.get(reverse('contact-search'), {'q': 'doe'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_search_unauthenticated(self):
+        """
+        Searching without logging in returns a 401 UNAUTHORIZED.
+        """
+        response = self.client.get(reverse('contact-search'), {'q': 'doe'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
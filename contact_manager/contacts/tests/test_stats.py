@@ -0,0 +1,142 @@
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.bulk import apply_operations, import_contacts
+from contacts.dedup import merge_contacts
+from contacts.models import Contact, ContactStats
+from contacts.normalize import index_letter
+from contacts.tests.test_contacts import create_contact
+
+
+class IndexLetterTests(TestCase):
+    def test_index_letter(self):
+        """
+        Last names are filed under their unaccented capital initial, or '#'.
+        """
+        self.assertEqual(
+            [index_letter(name) for name in ('lovelace', 'Élan', ' Turing', '', "1st", '_x')],
+            ['L', 'E', 'T', '#', '#', '#'])
+
+
+class ContactStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.ada = create_contact(first_name='Ada', last_name='Lovelace', owner=self.user)
+        self.alan = create_contact(first_name='Alan', last_name='Turing', owner=self.user)
+
+    def stats(self):
+        stats = ContactStats.objects.get(owner=self.user)
+        return stats.total, stats.letters
+
+    def test_create_and_delete(self):
+        """
+        Creating and deleting contacts moves the total and the letter counts.
+        """
+        self.assertEqual(self.stats(), (2, {'L': 1, 'T': 1}))
+        create_contact(first_name='Grace', last_name='Hopper', owner=self.user)
+        self.alan.delete()
+        self.assertEqual(self.stats(), (2, {'H': 1, 'L': 1}))
+
+    def test_rename(self):
+        """
+        Renaming a contact moves it to its new letter; other edits only touch last_modified.
+        """
+        before = ContactStats.objects.get(owner=self.user).last_modified
+        contact = Contact.objects.get(pk=self.ada.pk)
+        contact.notes = 'Poet'
+        contact.save()
+        self.assertGreater(ContactStats.objects.get(owner=self.user).last_modified, before)
+        contact.last_name = 'Byron'
+        contact.save(update_fields=['last_name'])
+        self.assertEqual(self.stats(), (2, {'B': 1, 'T': 1}))
+
+    def test_deferred_contact(self):
+        """
+        A contact loaded without its last name is counted from the stored row.
+        """
+        contact = Contact.objects.only('id', 'owner').get(pk=self.ada.pk)
+        contact.delete()
+        self.assertEqual(self.stats(), (1, {'T': 1}))
+
+    def test_bulk_writes(self):
+        """
+        Imports, batches and merges keep the stats in step.
+        """
+        import_contacts(self.user, BytesIO(b'first_name,last_name\nAda,lovelace\nEmil,Zola\n'), 'csv')
+        self.assertEqual(self.stats(), (4, {'L': 2, 'T': 1, 'Z': 1}))
+        zola = Contact.objects.get(last_name='Zola')
+        apply_operations(self.user, [
+            {'op': 'update', 'id': self.alan.pk, 'data': {'last_name': 'Church'}},
+            {'op': 'delete', 'id': zola.pk},
+        ])
+        self.assertEqual(self.stats(), (3, {'C': 1, 'L': 2}))
+        twin = Contact.objects.get(last_name='lovelace')
+        merge_contacts(self.user, self.ada.pk, [twin.pk])
+        self.assertEqual(self.stats(), (2, {'C': 1, 'L': 1}))
+
+    def test_reconcile(self):
+        """
+        The reconcile command repairs drifted stats and leaves correct ones alone.
+        """
+        other = User.objects.create(username='other_user')
+        create_contact(first_name='Some', last_name='One', owner=other)
+        ContactStats.objects.filter(owner=self.user).update(total=7, letters={'Q': 7})
+        out = StringIO()
+        call_command('reconcile_contact_stats', stdout=out)
+        self.assertIn('repaired 1 of 2 users', out.getvalue())
+        self.assertEqual(self.stats(), (2, {'L': 1, 'T': 1}))
+        self.assertFalse(ContactStats.objects.reconcile(self.user.id))
+
+
+class ContactStatsEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        create_contact(first_name='Ada', last_name='Lovelace', owner=self.user)
+        create_contact(first_name='Alan', last_name='Turing', owner=self.user)
+        create_contact(first_name='Emil', last_name='Lenz', owner=self.user)
+
+    def test_user_detail_stats(self):
+        """
+        Reading a user returns their contact stats from a single query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['contact_count'], 3)
+        self.assertEqual(response.data['contact_stats']['letters'], {'L': 2, 'T': 1})
+        self.assertIsNotNone(response.data['contact_stats']['last_modified'])
+
+    def test_user_without_contacts(self):
+        """
+        A user who never had a contact reads as having none.
+        """
+        other = User.objects.create(username='other_user')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('user-detail', kwargs={'pk': other.pk}))
+        self.assertEqual(response.data['contact_count'], 0)
+        self.assertEqual(response.data['contact_stats'], {'total': 0, 'last_modified': None, 'letters': {}})
+
+    @override_settings(CONTACTS_SHARED_CACHE=True)
+    def test_list_headers(self):
+        """
+        Listing contacts returns the stats in headers, from the cache too.
+        """
+        first = self.client.get(reverse('contact-list'), {'fields': 'last_name'})
+        self.assertEqual(first['X-Contact-Count'], '3')
+        self.assertEqual(first['X-Contact-Letters'], 'L=2,T=1')
+        self.assertIn('X-Contacts-Modified', first)
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('contact-list'), {'fields': 'last_name'})
+        self.assertEqual(second['X-Contact-Letters'], 'L=2,T=1')
+
+        self.client.post(reverse('contact-list'), {'first_name': 'Grace', 'last_name': 'Hopper'}, format='json')
+        response = self.client.get(reverse('contact-list'), {'fields': 'last_name'})
+        self.assertEqual(response['X-Contact-Count'], '4')
+        self.assertEqual(response['X-Contact-Letters'], 'H=1,L=2,T=1')
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.bulk import import_contacts
+from contacts.models import Contact, SyncState
+from contacts.tests.test_contacts import create_contact
+
+
+class ContactChangesTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.first = create_contact(first_name='first', last_name='one', owner=self.user)
+        self.second = create_contact(first_name='second', last_name='two', owner=self.user)
+
+    def changes(self, since, **params):
+        return self.client.get(reverse('contact-changes'), {'since': since, **params})
+
+    def test_initial_sync(self):
+        """
+        Syncing from 0 lists every live contact and returns a sync token.
+        """
+        self.second.delete()
+        response = self.changes(0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['changed']], [self.first.id])
+        self.assertEqual(data['changed'][0]['owner'], 'test_user')
+        self.assertIn('updated', data['changed'][0])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['more'])
+
+    def test_only_changes_since_token(self):
+        """
+        A sync token brings back only the contacts written or deleted after it.
+        """
+        token = self.changes(0).json()['sync_token']
+        self.assertEqual(self.changes(token).json()['changed'], [])
+
+        self.first.first_name = 'renamed'
+        self.first.save()
+        self.second.delete()
+        third = create_contact(first_name='third', last_name='three', owner=self.user)
+        data = self.changes(token).json()
+        self.assertEqual([row['id'] for row in data['changed']], [self.first.id, third.id])
+        self.assertEqual(data['changed'][0]['first_name'], 'renamed')
+        self.assertEqual(data['deleted'], [self.second.id])
+        self.assertGreater(int(data['sync_token']), int(token))
+
+    def test_paging(self):
+        """
+        Changes come in pages, with more set until the last one.
+        """
+        data = self.changes(0, page_size=1).json()
+        self.assertTrue(data['more'])
+        self.assertEqual([row['id'] for row in data['changed']], [self.first.id])
+        data = self.changes(data['sync_token'], page_size=1).json()
+        self.assertEqual([row['id'] for row in data['changed']], [self.second.id])
+        self.assertFalse(self.changes(data['sync_token'], page_size=1).json()['more'])
+
+    def test_other_owners_not_included(self):
+        """
+        Changes to other users' contacts never show up.
+        """
+        token = self.changes(0).json()['sync_token']
+        other = User.objects.create(username='not_test_user')
+        create_contact(first_name='other', last_name='other', owner=other)
+        self.assertEqual(self.changes(token).json()['changed'], [])
+
+    def test_invalid_token(self):
+        """
+        A malformed sync token returns a 400 BAD REQUEST.
+        """
+        self.assertEqual(self.changes('abc').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_soft_delete(self):
+        """
+        Deleting through the API leaves a tombstone hidden from the regular endpoints.
+        """
+        response = self.client.delete(reverse('contact-detail', kwargs={'pk': self.first.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(Contact.all_objects.get(pk=self.first.pk).deleted)
+        self.assertFalse(Contact.objects.filter(pk=self.first.pk).exists())
+        response = self.client.get(reverse('contact-detail', kwargs={'pk': self.first.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(response.data['contact_count'], 1)
+
+    def test_bulk_import_revisions(self):
+        """
+        Imported contacts get distinct revisions after the existing ones.
+        """
+        token = self.changes(0).json()['sync_token']
+        import_contacts(self.user, BytesIO(b'first_name,last_name\na,b\nc,d\n'), 'csv')
+        data = self.changes(token).json()
+        self.assertEqual([row['first_name'] for row in data['changed']], ['a', 'c'])
+        self.assertEqual(int(data['sync_token']), SyncState.objects.get(owner=self.user).revision)
+
+
+class PurgeTombstonesTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        self.contact = create_contact(first_name='first', last_name='last', owner=self.user)
+
+    def test_purge_expires_old_tokens(self):
+        """
+        Purging old tombstones removes them and expires tokens that predate them.
+        """
+        token = self.client.get(reverse('contact-changes'), {'since': 0}).json()['sync_token']
+        self.contact.delete()
+        Contact.all_objects.filter(pk=self.contact.pk).update(deleted=timezone.now() - timedelta(days=60))
+        call_command('purge_tombstones', days=30, stdout=StringIO())
+        self.assertFalse(Contact.all_objects.filter(pk=self.contact.pk).exists())
+        response = self.client.get(reverse('contact-changes'), {'since': token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        response = self.client.get(reverse('contact-changes'), {'since': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_recent_tombstones_kept(self):
+        """
+        Tombstones younger than the retention period are kept.
+        """
+        self.contact.delete()
+        call_command('purge_tombstones', days=30, stdout=StringIO())
+        self.assertTrue(Contact.all_objects.filter(pk=self.contact.pk).exists())
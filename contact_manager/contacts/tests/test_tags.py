@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.bulk import delete_user, purge_tombstones
+from contacts.dedup import merge_contacts
+from contacts.models import Contact, ContactTag, Tag
+from contacts.tests.test_contacts import create_contact
+
+
+class TagTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.other = User.objects.create(username='other_user')
+        self.client.force_authenticate(user=self.user)
+        self.ada = create_contact(first_name='Ada', last_name='Lovelace', owner=self.user)
+        self.alan = create_contact(first_name='Alan', last_name='Turing', owner=self.user)
+        self.grace = create_contact(first_name='Grace', last_name='Hopper', owner=self.user)
+        self.stranger = create_contact(first_name='Some', last_name='One', owner=self.other)
+        self.work = Tag.objects.create(owner=self.user, name='work')
+
+    def assign(self, tag, **data):
+        return self.client.post(reverse('tag-contacts', kwargs={'pk': tag.pk}), data, format='json')
+
+    def list_tagged(self, tag):
+        return self.client.get(reverse('contact-list'), {'tag': tag}).json()['results']
+
+    def test_create_tag(self):
+        """
+        Creating a tag returns a 201 CREATED.
+        """
+        response = self.client.post(reverse('tag-list'), {'name': ' family '}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'family')
+        self.assertEqual(response.data['contact_count'], 0)
+
+    def test_create_duplicate_tag(self):
+        """
+        Creating a tag with a name already used returns a 400 BAD REQUEST; other users' names are free.
+        """
+        response = self.client.post(reverse('tag-list'), {'name': 'work'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post(reverse('tag-list'), {'name': 'work'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_assign_contacts(self):
+        """
+        Assigning adds the owner's contacts in bulk and reports the rest as missing.
+        """
+        response = self.assign(self.work, add=[self.ada.pk, self.alan.pk, self.stranger.pk, 0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'added': 2, 'removed': 0, 'missing': [0, self.stranger.pk]})
+        response = self.assign(self.work, add=[self.ada.pk], remove=[self.alan.pk])
+        self.assertEqual(response.data, {'added': 0, 'removed': 1, 'missing': []})
+        self.assertEqual(list(self.work.contacts.all()), [self.ada])
+
+    def test_assign_invalid(self):
+        """
+        Assigning nothing, or the same contact both ways, returns a 400 BAD REQUEST.
+        """
+        self.assertEqual(self.assign(self.work).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.assign(self.work, add=[self.ada.pk], remove=[self.ada.pk])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_tag(self):
+        """
+        Listing with a tag returns only the contacts with it, and reflects changes at once.
+        """
+        self.assign(self.work, add=[self.grace.pk, self.ada.pk])
+        self.assertEqual([row['id'] for row in self.list_tagged(self.work.pk)], [self.grace.pk, self.ada.pk])
+        self.assign(self.work, remove=[self.grace.pk])
+        self.assertEqual([row['id'] for row in self.list_tagged(self.work.pk)], [self.ada.pk])
+
+    def test_filter_by_invalid_tag(self):
+        """
+        Listing with a tag that is not an id returns a 400 BAD REQUEST.
+        """
+        response = self.client.get(reverse('contact-list'), {'tag': 'work'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_other_users_tag(self):
+        """
+        Listing with another user's tag returns none of their contacts.
+        """
+        theirs = Tag.objects.create(owner=self.other, name='theirs')
+        ContactTag.objects.create(owner=self.other, tag=theirs, contact=self.stranger)
+        self.assertEqual(self.list_tagged(theirs.pk), [])
+
+    def test_tag_counts_single_query(self):
+        """
+        Listing tags counts their live contacts in a single query.
+        """
+        family = Tag.objects.create(owner=self.user, name='family')
+        self.assign(self.work, add=[self.ada.pk, self.alan.pk, self.grace.pk])
+        self.assign(family, add=[self.ada.pk])
+        self.grace.delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tag-list'))
+        self.assertEqual(
+            [(tag['name'], tag['contact_count']) for tag in response.data], [('family', 1), ('work', 2)])
+
+    def test_other_users_tag(self):
+        """
+        Reading, assigning or deleting another user's tag returns a 404 NOT FOUND.
+        """
+        theirs = Tag.objects.create(owner=self.other, name='theirs')
+        url = reverse('tag-detail', kwargs={'pk': theirs.pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.assign(theirs, add=[self.ada.pk]).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(ContactTag.objects.filter(tag=theirs).exists())
+
+    def test_rename_tag(self):
+        """
+        Renaming a tag returns a 200 OK.
+        """
+        response = self.client.patch(
+            reverse('tag-detail', kwargs={'pk': self.work.pk}), {'name': 'office'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.get(pk=self.work.pk).name, 'office')
+
+    def test_delete_tag(self):
+        """
+        Deleting a tag returns a 204 NO CONTENT and keeps its contacts.
+        """
+        self.assign(self.work, add=[self.ada.pk])
+        self.assertEqual(len(self.list_tagged(self.work.pk)), 1)
+        response = self.client.delete(reverse('tag-detail', kwargs={'pk': self.work.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.list_tagged(self.work.pk), [])
+        self.assertTrue(Contact.objects.filter(pk=self.ada.pk).exists())
+
+    def test_merge_keeps_tags(self):
+        """
+        Merging duplicates puts the merged contact in every tag of the duplicates.
+        """
+        twin = create_contact(first_name='Ada', last_name='Lovelace', owner=self.user)
+        self.assign(self.work, add=[twin.pk])
+        merge_contacts(self.user, self.ada.pk, [twin.pk])
+        self.assertEqual([row['id'] for row in self.list_tagged(self.work.pk)], [self.ada.pk])
+
+    def test_purge_and_delete_user_with_tags(self):
+        """
+        Purging tombstones and deleting users also removes their tag memberships.
+        """
+        self.assign(self.work, add=[self.ada.pk, self.alan.pk])
+        self.ada.delete()
+        purge_tombstones(timezone.now() + timedelta(days=1))
+        self.assertEqual(list(ContactTag.objects.values_list('contact_id', flat=True)), [self.alan.pk])
+        delete_user(self.user)
+        self.assertFalse(ContactTag.objects.exists())
+        self.assertFalse(Tag.objects.exists())
@@ -1,10 +1,25 @@
 import json
+from io import StringIO
+from unittest import mock
 
+from django.conf import global_settings
+from django.contrib.auth.hashers import get_hasher, make_password
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
 from django.forms.models import model_to_dict
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils.module_loading import import_string
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from contacts.availability import BloomFilter, availability_filter
+from contacts.bulk import delete_user
+from contacts.models import Contact, Job, SyncState
+from contacts.tests.test_contacts import create_contact
 
 
 class UserCreateTests(TestCase):
@@ -122,4 +137,282 @@ class UserDetailTests(TestCase):
             reverse('user-detail', kwargs={'pk': not_user.pk}),
             content_type='application/json'
         )
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserDetailQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        for i in range(5):
+            create_contact(first_name='first', last_name=f'last{i}', owner=self.user)
+
+    def test_contact_count_single_query(self):
+        """
+        A user's profile carries their contact count and costs one query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(response.data['contact_count'], 5)
+        self.assertTrue(response.data['contacts_url'].endswith(reverse('contact-list')))
+        self.assertNotIn('contacts', response.data)
+
+    def test_expand_contacts(self):
+        """
+        Expanding contacts links each of them with one extra query in total.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('user-detail', kwargs={'pk': self.user.pk}), {'expand': 'contacts'})
+        self.assertEqual(len(response.data['contacts']), 5)
+
+
+class UserDeleteTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user')
+        self.client.force_authenticate(user=self.user)
+        for i in range(5):
+            create_contact(first_name='first', last_name=f'last{i}', owner=self.user)
+        Contact.objects.filter(owner=self.user).first().delete()
+        self.other = create_contact(first_name='other', last_name='contact', owner=User.objects.create(username='other'))
+
+    def test_delete_in_chunks(self):
+        """
+        Deleting a user removes their contacts and tombstones a chunk at a time, then the user.
+        """
+        Token.objects.create(user=self.user)
+        reports = []
+        deleted = delete_user(self.user, chunk_size=2, progress=lambda done, total: reports.append((done, total)))
+        self.assertEqual(deleted, 5)
+        self.assertEqual(reports, [(0, 5), (2, 5), (4, 5), (5, 5)])
+        self.assertFalse(User.objects.filter(username='test_user').exists())
+        self.assertFalse(Contact.all_objects.filter(owner_id=self.user.id).exists())
+        self.assertFalse(SyncState.objects.filter(owner_id=self.user.id).exists())
+        self.assertFalse(Token.objects.exists())
+        self.assertTrue(Contact.objects.filter(pk=self.other.pk).exists())
+
+    def test_delete_endpoint(self):
+        """
+        Deleting own profile with contacts returns a 204 NO CONTENT.
+        """
+        response = self.client.delete(reverse('user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Contact.all_objects.count(), 1)
+
+    def test_delete_in_background(self):
+        """
+        Deleting in the background returns a 202 ACCEPTED and the job deletes the user.
+        """
+        response = self.client.delete(reverse('user-detail', kwargs={'pk': self.user.pk}) + '?background=true')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['kind'], 'delete_user')
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        call_command('run_jobs', processes=0, once=True, stdout=StringIO())
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Contact.all_objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+
+class UserLoginTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+
+    def login(self, headers=None, **data):
+        return self.client.post(
+            reverse('user-login'), {'username': 'test_user', 'password': 'test_password', **data}, format='json',
+            headers=headers)
+
+    def test_login_returns_token_without_session(self):
+        """
+        Logging in returns a token and writes no session unless asked to.
+        """
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.user.pk)
+        self.assertTrue(response.data['token'])
+        self.assertFalse(Session.objects.exists())
+
+    def test_login_with_session(self):
+        """
+        Passing session starts a session as well.
+        """
+        response = self.login(session=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Session.objects.exists())
+
+    def test_wrong_password(self):
+        """
+        Logging in with a wrong password returns a 400 BAD REQUEST.
+        """
+        response = self.login(password='wrong')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CONTACTS_PBKDF2_ITERATIONS=1000)
+    def test_rehash_on_login(self):
+        """
+        A password hashed with an outdated work factor is rehashed on login.
+        """
+        self.user.password = make_password('test_password', hasher='pbkdf2_sha1')
+        self.user.save()
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_default_hashers_still_verify(self):
+        """
+        Hashes made by any of Django's default hashers can still be verified.
+        """
+        for path in global_settings.PASSWORD_HASHERS:
+            algorithm = import_string(path).algorithm
+            self.assertEqual(get_hasher(algorithm).algorithm, algorithm)
+
+    @override_settings(CONTACTS_LOGIN_THROTTLE_RATES={'username': '3/min'})
+    def test_throttle_per_username(self):
+        """
+        Attempts beyond a username's bucket return a 429 TOO MANY REQUESTS.
+        """
+        for _ in range(3):
+            self.assertEqual(self.login(password='wrong').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        User.objects.create_user(username='other_user', password='test_password')
+        self.assertEqual(self.login(username='other_user').status_code, status.HTTP_200_OK)
+
+    @override_settings(CONTACTS_LOGIN_THROTTLE_RATES={'ip': '2/min'})
+    def test_throttle_per_ip(self):
+        """
+        Attempts beyond a client IP's bucket are throttled whatever the username.
+        """
+        self.login()
+        self.login(username='someone_else')
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(CONTACTS_LOGIN_THROTTLE_RATES={'ip': '1/min', 'username': '2/min'})
+    def test_refused_attempt_spends_no_tokens(self):
+        """
+        An attempt refused by one scope does not take a token from the others.
+        """
+        self.login(username='someone_else')
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        for ip in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post(
+                reverse('user-login'), {'username': 'test_user', 'password': 'test_password'}, format='json',
+                REMOTE_ADDR=ip)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(CONTACTS_LOGIN_THROTTLE_RATES={'ip': '60/min', 'username': '10/min'})
+    def test_non_object_body(self):
+        """
+        A body that is not an object, or a username that is not a string, returns a 400 BAD REQUEST.
+        """
+        for data in ([], 'test_user', {'username': ['test_user'], 'password': 'test_password'}):
+            response = self.client.post(reverse('user-login'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, msg=data)
+
+    @override_settings(CONTACTS_LOGIN_THROTTLE_RATES={'ip': '2/min'})
+    def test_throttle_ignores_spoofed_forwarded_for(self):
+        """
+        Rotating the X-Forwarded-For header does not give a client a fresh bucket.
+        """
+        for i in range(2):
+            self.login(headers={'X-Forwarded-For': f'10.0.0.{i}'})
+        response = self.login(headers={'X-Forwarded-For': '10.0.0.99'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class UserExistsBatchTests(APITestCase):
+    def setUp(self):
+        availability_filter.clear()
+        User.objects.create_user(username='taken_user', email='Taken@Test.com', password='test_password')
+
+    def check(self, usernames=(), emails=()):
+        return self.client.post(
+            reverse('user-exists-batch'), {'usernames': list(usernames), 'emails': list(emails)}, format='json')
+
+    def test_batch_availability(self):
+        """
+        Each username and email is reported as available or not, emails regardless of case.
+        """
+        response = self.check(['taken_user', 'free_user'], ['taken@test.COM', 'free@test.com'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'usernames': {'taken_user': False, 'free_user': True},
+            'emails': {'taken@test.COM': False, 'free@test.com': True},
+        })
+
+    def test_single_query(self):
+        """
+        Possible matches are looked up together in one query, free names in none.
+        """
+        self.check(['warm_up'])
+        with self.assertNumQueries(1):
+            self.check(['taken_user'], ['taken@test.com'])
+        free = [f'free_user_{i}' for i in range(50)]
+        with self.assertNumQueries(0):
+            response = self.check(free)
+        self.assertEqual(sum(response.data['usernames'].values()), 50)
+
+    def test_new_users_seen(self):
+        """
+        A user registered after the filter was built is reported as taken.
+        """
+        self.check(['warm_up'])
+        User.objects.create_user(username='new_user', email='new@test.com', password='test_password')
+        response = self.check(['new_user'], ['NEW@test.com'])
+        self.assertEqual(response.data['usernames'], {'new_user': False})
+        self.assertEqual(response.data['emails'], {'NEW@test.com': False})
+
+    def test_rebuild_outside_lock(self):
+        """
+        Rebuilds scan the users without the lock, and keep users saved during the scan.
+        """
+        availability_filter.refresh()
+        build = availability_filter._build
+
+        def slow_build():
+            self.assertFalse(availability_filter._lock.locked())
+            # Saved while the scan runs, after it read the table.
+            availability_filter.add('during_scan', 'During@Test.com')
+            self.assertEqual(availability_filter.candidates(['taken_user'], []), (['taken_user'], []))
+            return build()
+
+        with mock.patch.object(availability_filter, '_build', slow_build):
+            availability_filter.refresh()
+        self.assertEqual(
+            availability_filter.candidates(['during_scan'], ['during@test.com']), (['during_scan'], ['during@test.com']))
+
+    def test_batch_limit(self):
+        """
+        Checking more names than CONTACTS_AVAILABILITY_BATCH_SIZE returns a 400 BAD REQUEST.
+        """
+        with self.settings(CONTACTS_AVAILABILITY_BATCH_SIZE=2):
+            response = self.check(['a', 'b'], ['c@test.com'])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_email_case_insensitive(self):
+        """
+        Registering with an email that differs only in case returns a 400 BAD REQUEST.
+        """
+        response = self.client.post(reverse('user-create'), {
+            'username': 'other_user', 'password': 'test_password', 'email': 'TAKEN@test.com',
+            'first_name': 'first', 'last_name': 'last'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        """
+        Every added item is found, and few others are.
+        """
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
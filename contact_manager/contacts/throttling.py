@@ -0,0 +1,108 @@
+import hashlib
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str):
+    """
+    Turn a DRF style rate such as '10/min' into (capacity, tokens per second).
+    """
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / DURATIONS[period[0]]
+
+
+class TokenBucket:
+    """
+    A token bucket kept in the Django cache, so every worker shares it.
+
+    A bucket starts full with capacity tokens and refills at rate tokens per
+    second; each request takes one. Reads and writes are not atomic, so under
+    heavy concurrency a few extra requests may get through, which is fine for
+    throttling.
+    """
+
+    def __init__(self, key: str, capacity: int, rate: float):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+
+    def tokens(self, now: float):
+        """
+        Return the tokens in the bucket at now, refill included.
+        """
+        tokens, updated = cache.get(self.key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def wait(self, now: float = None):
+        """
+        Return 0 if a token is available, otherwise the seconds until one is, without taking it.
+        """
+        tokens = self.tokens(time.time() if now is None else now)
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, now: float = None):
+        """
+        Take a token. Return 0 on success, otherwise the seconds until one is available.
+        """
+        now = time.time() if now is None else now
+        tokens = self.tokens(now)
+        if tokens < 1:
+            cache.set(self.key, (tokens, now), self.timeout)
+            return (1 - tokens) / self.rate
+        cache.set(self.key, (tokens - 1, now), self.timeout)
+        return 0
+
+    @property
+    def timeout(self):
+        # Once refilled, a bucket is the same as a missing one.
+        return int(self.capacity / self.rate) + 1
+
+
+class LoginThrottle(BaseThrottle):
+    """
+    Throttle login attempts per client IP and per username with token buckets.
+
+    Rates come from CONTACTS_LOGIN_THROTTLE_RATES, e.g. {'ip': '60/min',
+    'username': '10/min'}; leave a scope out to disable it. The check runs
+    before any password is hashed, so brute force traffic is turned away
+    cheaply. Client IPs come from REST_FRAMEWORK['NUM_PROXIES'], so only
+    the hops added by trusted proxies are read from X-Forwarded-For.
+
+    Every bucket is checked before a token is taken from any of them, so an
+    attempt refused by one scope does not drain the others.
+    """
+    cache_format = 'contacts:login-throttle:%s:%s'
+
+    def allow_request(self, request, view):
+        rates = getattr(settings, 'CONTACTS_LOGIN_THROTTLE_RATES', {})
+        username = request.data.get('username') if isinstance(request.data, Mapping) else None
+        idents = {
+            'ip': self.get_ident(request),
+            'username': username.strip().lower() if isinstance(username, str) else '',
+        }
+        buckets = []
+        for scope, rate in rates.items():
+            if not rate or not idents.get(scope):
+                continue
+            capacity, refill = parse_rate(rate)
+            # Idents are client supplied, so hash them into a safe cache key.
+            ident = hashlib.sha256(idents[scope].encode()).hexdigest()
+            buckets.append(TokenBucket(self.cache_format % (scope, ident), capacity, refill))
+        now = time.time()
+        self.wait_time = max((bucket.wait(now) for bucket in buckets), default=0)
+        if self.wait_time:
+            return False
+        for bucket in buckets:
+            self.wait_time = max(self.wait_time, bucket.take(now))
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
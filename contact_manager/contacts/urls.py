@@ -1,15 +1,60 @@
 from django.urls import path
 from rest_framework.urlpatterns import format_suffix_patterns
 
-from contacts import views
+from contacts import async_views, views
 
 urlpatterns = format_suffix_patterns([
     path('contacts/', 
          views.ContactList.as_view(), 
          name='contact-list'),
+    path('contacts/batch/', 
+         views.ContactBatch.as_view(), 
+         name='contact-batch'),
+    path('contacts/bulk/', 
+         views.ContactBulkImport.as_view(), 
+         name='contact-bulk-import'),
+    path('contacts/export/', 
+         views.ContactExport.as_view(), 
+         name='contact-export'),
+    path('contacts/changes/', 
+         views.ContactChanges.as_view(), 
+         name='contact-changes'),
+    path('contacts/duplicates/', 
+         views.ContactDuplicates.as_view(), 
+         name='contact-duplicates'),
+    path('contacts/duplicates/merge/', 
+         views.ContactMerge.as_view(), 
+         name='contact-merge'),
+    path('contacts/search/notes/', 
+         views.ContactFullTextSearch.as_view(), 
+         name='contact-fulltext-search'),
+    path('contacts/lookup/', 
+         views.ContactLookup.as_view(), 
+         name='contact-lookup'),
+    path('contacts/search/', 
+         views.ContactSearch.as_view(), 
+         name='contact-search'),
     path('contacts/<int:pk>/', 
          views.ContactDetail.as_view(), 
          name='contact-detail'),
+    path('tags/',
+         views.TagList.as_view(),
+         name='tag-list'),
+    path('tags/<int:pk>/',
+         views.TagDetail.as_view(),
+         name='tag-detail'),
+    path('tags/<int:pk>/contacts/',
+         views.TagContacts.as_view(),
+         name='tag-contacts'),
+    path('jobs/',
+         views.JobList.as_view(),
+         name='job-list'),
+    path('jobs/<int:pk>/',
+         views.JobDetail.as_view(),
+         name='job-detail'),
+    path('jobs/<int:pk>/cancel/',
+         views.JobCancel.as_view(),
+         name='job-cancel'),
     path('user/register/', 
          views.UserCreate.as_view(), 
          name='user-create'),
@@ -19,4 +64,20 @@ urlpatterns = format_suffix_patterns([
      path('user/exists/',
           views.UserExists.as_view(),
           name='user-exists'),
-])
\ No newline at end of file
+     path('user/exists/batch/',
+          views.UserExistsBatch.as_view(),
+          name='user-exists-batch'),
+])
+
+# Async equivalents of the contact endpoints, for deployments served over ASGI.
+urlpatterns += [
+    path('async/contacts/',
+         async_views.contact_list,
+         name='async-contact-list'),
+    path('async/contacts/search/',
+         async_views.contact_search,
+         name='async-contact-search'),
+    path('async/contacts/<int:pk>/',
+         async_views.contact_detail,
+         name='async-contact-detail'),
+]
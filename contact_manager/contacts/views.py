@@ -1,46 +1,383 @@
+from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db.models import Count, Prefetch, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, parse_header_parameters
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import BooleanField, DateTimeField
+from rest_framework.parsers import FileUploadParser, MultiPartParser
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 
-from contacts.models import Contact
+from contacts.authentication import token_cache
+from contacts.availability import check_availability
+from contacts.bulk import apply_operations, delete_user, import_contacts, tag_contacts
+from contacts.cache import OwnerCachedResponseMixin
+from contacts.dedup import merge_contacts, owner_clusters
+from contacts.formats import CONTACT_FIELDS, FORMATS, FormatError, detect_format, write_contacts
+from contacts.fulltext import search_notes
+from contacts.jobs import cancel, enqueue
+from contacts.models import Contact, ContactStats, Job, SyncState, Tag
+from contacts.normalize import normalize_email, normalize_phone
+from contacts.pagination import ContactCursorPagination, ContactSearchPagination
 from contacts.permissions import IsOwner, IsUser
-from contacts.serializers import ContactSerializer, UserSerializer
+from contacts.instrumentation import timed
+from contacts.renderers import COMPACT_RENDERERS, contact_rows
+from contacts.routers import ReplicaReadMixin
+from contacts.search import search_contacts
+from contacts.serializers import (
+    AvailabilitySerializer, ContactBatchSerializer, ContactMergeSerializer, ContactSearchResultSerializer,
+    ContactSerializer, JobSerializer, TagAssignmentSerializer, TagSerializer, UserSerializer, expanded_fields,
+)
+from contacts.throttling import LoginThrottle
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ContactList(generics.ListCreateAPIView):
+class ContactList(ReplicaReadMixin, OwnerCachedResponseMixin, generics.ListCreateAPIView):
     """
     List all contacts, or Create a new contact.
+
+    Listings are cursor paginated, `?fields=first_name,last_name` limits both
+    the columns loaded and the fields rendered, and `?tag=<id>` lists only the
+    contacts with that tag. Besides JSON, pages can be requested as columnar
+    JSON (`Accept: application/vnd.contacts.columnar+json`) or MessagePack
+    (`Accept: application/msgpack`).
+
+    Listings also carry the user's ContactStats, whatever the filters:
+    `X-Contact-Count`, `X-Contact-Letters` (`A=12,B=3,...`, for alphabet jump
+    navigation) and `X-Contacts-Modified`.
     """
     permission_classes = [permissions.IsAuthenticated, IsOwner]
     serializer_class = ContactSerializer
+    pagination_class = ContactCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, *COMPACT_RENDERERS]
+    cached_headers = ('X-Contact-Count', 'X-Contact-Letters', 'X-Contacts-Modified')
+
+    def get_fields(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = set(fields) - set(ContactSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_tag(self):
+        tag = self.request.query_params.get('tag')
+        if tag is None or self.request.method not in permissions.SAFE_METHODS:
+            return None
+        try:
+            return int(tag)
+        except ValueError:
+            raise ValidationError({'tag': 'Expected a tag id.'})
 
     def get_queryset(self):
         user = self.request.user
-        return Contact.objects.filter(owner=user)
+        queryset = Contact.objects.filter(owner=user)
+        tag = self.get_tag()
+        if tag is not None:
+            # One join, served by the (owner, tag, contact) membership index.
+            queryset = queryset.filter(memberships__owner=user, memberships__tag_id=tag)
+        fields = self.get_fields()
+        if fields is None:
+            return queryset.select_related('owner')
+        columns = {'id', 'last_name'}
+        for name in fields:
+            columns.add('owner__username' if name == 'owner' else name)
+        if 'owner' in fields:
+            queryset = queryset.select_related('owner')
+        return queryset.only(*columns)
+
+    def list(self, request, *args, **kwargs):
+        response = self.list_page(request, *args, **kwargs)
+        # Read afresh: the authenticated user may be a cached instance.
+        stats = ContactStats.objects.filter(owner=request.user).first() or ContactStats()
+        response['X-Contact-Count'] = str(stats.total)
+        response['X-Contact-Letters'] = ','.join(f'{letter}={count}' for letter, count in stats.letters.items())
+        if stats.last_modified is not None:
+            response['X-Contacts-Modified'] = http_date(stats.last_modified.timestamp())
+        return response
+
+    def list_page(self, request, *args, **kwargs):
+        # Plain data renderers skip the serializer: rows come straight from
+        # values() and are encoded in one go, producing the same bytes as the
+        # serializer path. render_plain() only writes compact output, so media
+        # type parameters such as indent=4 go through the regular renderer.
+        renderer = request.accepted_renderer
+        _, params = parse_header_parameters(request.accepted_media_type or '')
+        if not hasattr(renderer, 'render_plain') or params or self.get_renderer_context().get('indent'):
+            return super().list(request, *args, **kwargs)
+
+        requested = self.get_fields() or ContactSerializer.Meta.fields
+        fields = [name for name in ContactSerializer.Meta.fields if name in requested]
+        columns = {'id', 'last_name'} | {name for name in fields if name != 'owner'}
+        rows = self.get_queryset().values(*columns)
+        page = self.paginate_queryset(rows)
+        with timed('serialize'):
+            data = self.paginator.get_paginated_response(
+                contact_rows(page, fields, request.user.username)).data
+        with timed('render'):
+            content = renderer.render_plain(data)
+        return HttpResponse(content, content_type=renderer.media_type)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
     
 
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactBulkImport(generics.GenericAPIView):
+    """
+    Import contacts from an uploaded CSV, JSON Lines or vCard file.
+
+    The format comes from `?type=`, the filename or the upload's content type.
+    With `?background=true` the file is imported by a job instead, and the
+    answer is a 202 ACCEPTED with the job to poll.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FileUploadParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.data.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fmt = detect_format(upload.name, upload.content_type, request.query_params.get('type', ''))
+        except FormatError as e:
+            return Response({'type': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if BooleanField().to_internal_value(request.query_params.get('background', False)):
+            path = default_storage.save(f'imports/{request.user.id}/{upload.name}', upload)
+            job = enqueue(request.user, 'import_contacts', path=path, fmt=fmt)
+            data = JobSerializer(job, context=self.get_serializer_context()).data
+            return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+        report = import_contacts(request.user, upload.open('rb').file, fmt)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactBatch(generics.GenericAPIView):
+    """
+    Update or Delete many contacts at once.
+
+    Takes `{"operations": [{"op": "update", "id": 1, "data": {...}},
+    {"op": "delete", "id": 2}]}`; updates are partial. Answers with one result
+    per operation, so some may fail while the rest are applied.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactBatchSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_operations(request.user, serializer.validated_data['operations'])
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactExport(generics.GenericAPIView):
+    """
+    Download every contact as a CSV, JSON Lines or vCard file, picked with `?type=`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fmt = detect_format(requested=request.query_params.get('type', 'csv'))
+        except FormatError as e:
+            return Response({'type': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (
+            Contact.objects.filter(owner=request.user)
+            .order_by('last_name', 'id')
+            .values(*CONTACT_FIELDS)
+            .iterator(chunk_size=getattr(settings, 'CONTACTS_EXPORT_CHUNK_SIZE', 2000))
+        )
+        media_type, extensions = FORMATS[fmt]
+        return StreamingHttpResponse(
+            write_contacts(rows, fmt),
+            content_type=f'{media_type}; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename="contacts{extensions[0]}"'})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactSearch(ReplicaReadMixin, OwnerCachedResponseMixin, generics.ListAPIView):
+    """
+    Fuzzy search contacts by name, best matches first.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactSerializer
+    pagination_class = ContactSearchPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        return search_contacts(self.request.user.id, query)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactFullTextSearch(ReplicaReadMixin, OwnerCachedResponseMixin, generics.ListAPIView):
+    """
+    Full-text search contact notes and names, best matches first.
+
+    Each result carries its rank and a snippet of its notes, HTML escaped with
+    the matching words wrapped in <mark>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactSearchResultSerializer
+    pagination_class = ContactSearchPagination
+
+    def get_queryset(self):
+        return search_notes(self.request.user.id, self.request.query_params.get('q', ''))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactLookup(OwnerCachedResponseMixin, generics.ListAPIView):
+    """
+    Find contacts by exact phone number or email, ignoring formatting and case.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = Contact.objects.filter(owner=self.request.user).select_related('owner')
+        phone = self.request.query_params.get('phone')
+        email = self.request.query_params.get('email')
+        if phone:
+            normalized = normalize_phone(phone)
+            if not normalized:
+                raise ValidationError({'phone': 'Not a recognisable phone number.'})
+            queryset = queryset.filter(phone_normalized=normalized)
+        if email:
+            queryset = queryset.filter(email_normalized=normalize_email(email))
+        if not phone and not email:
+            raise ValidationError({'detail': 'Pass a phone or an email to look up.'})
+        return queryset
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactDuplicates(OwnerCachedResponseMixin, generics.GenericAPIView):
+    """
+    List clusters of contacts that are likely the same person, most likely first.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactSerializer
+    pagination_class = ContactSearchPagination
+
+    def get(self, request, *args, **kwargs):
+        clusters = self.paginate_queryset(owner_clusters(request.user.id))
+        ids = [pk for cluster in clusters for pk in cluster['ids']]
+        contacts = Contact.objects.filter(owner=request.user).select_related('owner').in_bulk(ids)
+        return self.get_paginated_response([
+            {
+                'score': cluster['score'],
+                'contacts': self.get_serializer([contacts[pk] for pk in cluster['ids']], many=True).data,
+            }
+            for cluster in clusters
+        ])
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactMerge(generics.GenericAPIView):
+    """
+    Merge duplicates into one contact, keeping all of their notes.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ContactMergeSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        contact = merge_contacts(request.user, **serializer.validated_data)
+        if contact is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ContactSerializer(contact, context=self.get_serializer_context()).data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContactChanges(OwnerCachedResponseMixin, generics.GenericAPIView):
+    """
+    List the contacts changed and deleted since a sync token.
+
+    Start with `?since=0`, which lists every live contact, then pass back the
+    returned `sync_token`; fetch again straight away while `more` is true. A
+    token older than the purged tombstones gets a 410 GONE, after which the
+    client starts over from 0.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_limit(self):
+        default = getattr(settings, 'CONTACTS_SYNC_PAGE_SIZE', 500)
+        maximum = getattr(settings, 'CONTACTS_SYNC_MAX_PAGE_SIZE', 2000)
+        try:
+            return max(1, min(int(self.request.query_params.get('page_size', default)), maximum))
+        except ValueError:
+            return default
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', 0))
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'since': 'Expected a sync token.'})
+
+        purged = SyncState.objects.filter(owner=request.user).values_list('purged_revision', flat=True).first() or 0
+        if since and since < purged:
+            return Response(
+                {'detail': 'This sync token has expired; sync again from 0.'}, status=status.HTTP_410_GONE)
+
+        queryset = Contact.all_objects.filter(owner=request.user, revision__gt=since)
+        if not since:
+            queryset = queryset.filter(deleted__isnull=True)
+        limit = self.get_limit()
+        fields = [name for name in ContactSerializer.Meta.fields if name != 'owner']
+        rows = list(queryset.order_by('revision').values(*fields, 'updated', 'deleted', 'revision')[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+
+        timestamp = DateTimeField()
+        changed = [row for row in rows if row['deleted'] is None]
+        with timed('serialize'):
+            results = contact_rows(changed, ContactSerializer.Meta.fields, request.user.username)
+            for result, row in zip(results, changed):
+                result['updated'] = timestamp.to_representation(row['updated'])
+        return Response({
+            'sync_token': str(rows[-1]['revision'] if rows else since),
+            'more': more,
+            'changed': results,
+            'deleted': [row['id'] for row in rows if row['deleted'] is not None],
+        })
+
+
 @method_decorator(csrf_exempt, name='dispatch')   
-class ContactDetail(generics.RetrieveDestroyAPIView):
+class ContactDetail(OwnerCachedResponseMixin, generics.RetrieveDestroyAPIView):
     """
     Read, Update, or Delete a contact.
     """
     permission_classes = [permissions.IsAuthenticated, IsOwner]
-    queryset = Contact.objects.all()
     serializer_class = ContactSerializer
 
-    def get(self, request, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
-        
+    def get_queryset(self):
+        # Scoping to the owner makes other users' contacts a plain 404 and lets
+        # the (owner, ...) indexes serve the lookup.
+        return Contact.objects.filter(owner=self.request.user).select_related('owner')
+
     def put(self, request, *args, **kawrgs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=False)
@@ -54,19 +391,132 @@ class ContactDetail(generics.RetrieveDestroyAPIView):
         return self.destroy(request, *args, **kwargs)
     
 
+@method_decorator(csrf_exempt, name='dispatch')
+class TagList(generics.ListCreateAPIView):
+    """
+    List all tags with their contact counts, or Create a new tag.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TagSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        # Every count comes from one grouped query over the memberships.
+        return Tag.objects.filter(owner=self.request.user).annotate(
+            contact_count=Count('memberships', filter=Q(memberships__contact__deleted__isnull=True)))
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TagDetail(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Read, Rename, or Delete a tag. Deleting a tag leaves its contacts alone.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOwner]
+    serializer_class = TagSerializer
+
+    def get_queryset(self):
+        return Tag.objects.filter(owner=self.request.user)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TagContacts(generics.GenericAPIView):
+    """
+    Add contacts to a tag and take others off it.
+
+    Takes `{"add": [1, 2], "remove": [3]}` and answers with the number of
+    contacts added and removed, and the ids of contacts that were not found.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOwner]
+    serializer_class = TagAssignmentSerializer
+
+    def get_queryset(self):
+        return Tag.objects.filter(owner=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        tag = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(tag_contacts(request.user, tag, **serializer.validated_data))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class JobList(generics.ListCreateAPIView):
+    """
+    List the user's background jobs, newest first, or Queue a new one.
+
+    Queue with `{"kind": "find_duplicates"}`; poll the returned job until its
+    status is succeeded, failed or cancelled.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+    pagination_class = ContactSearchPagination
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(request.user, serializer.validated_data['kind'])
+        data = self.get_serializer(job).data
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class JobDetail(generics.RetrieveAPIView):
+    """
+    Read a background job's status, progress and result.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class JobCancel(generics.GenericAPIView):
+    """
+    Cancel a background job.
+
+    Queued jobs are cancelled at once; running ones stop at their next
+    progress report. Finished jobs answer 409 CONFLICT.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        job = self.get_object()
+        if not cancel(job):
+            return Response({'detail': f'The job has already {job.status}.'}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(job).data)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class UserLogin(generics.GenericAPIView):
     """
     Handle user login.
+
+    Token clients get a token only; pass `session: true` to also start a
+    session for the browsable API. Attempts are throttled per IP and username.
     """
     serializer_class = ObtainAuthToken.serializer_class
+    throttle_classes = [LoginThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            login(request, user)
+            if BooleanField().to_internal_value(request.data.get('session', False)):
+                login(request, user)
             token, created = Token.objects.get_or_create(user=user)
+            token_cache.set(token.key, user, token)
             return Response({
                 'token': token.key,
                 'id': user.pk,
@@ -87,10 +537,22 @@ class UserCreate(generics.CreateAPIView):
 class UserDetail(generics.RetrieveDestroyAPIView):
     """
     Read, Update, or Delete a user. 
+
+    Deleting removes the user's contacts in chunks first. With
+    `?background=true` that runs as a job, and the answer is a 202 ACCEPTED
+    with the job to poll until the account is gone.
     """
     permission_classes = [permissions.IsAuthenticated, IsUser]
-    queryset = User.objects.all()
     serializer_class = UserSerializer
+
+    def get_queryset(self):
+        if self.request.method == 'DELETE':
+            return User.objects.all()
+        queryset = User.objects.select_related('contact_stats')
+        if 'contacts' in expanded_fields(self.request):
+            queryset = queryset.prefetch_related(
+                Prefetch('contacts', queryset=Contact.objects.only('id', 'owner_id')))
+        return queryset
         
     def put(self, request, *args, **kawrgs):
         instance = self.get_object()
@@ -99,6 +561,15 @@ class UserDetail(generics.RetrieveDestroyAPIView):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_204_NO_CONTENT)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        if BooleanField().to_internal_value(request.query_params.get('background', False)):
+            job = enqueue(user, 'delete_user')
+            data = JobSerializer(job, context=self.get_serializer_context()).data
+            return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+        delete_user(user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -117,3 +588,18 @@ class UserExists(generics.GenericAPIView):
 
         return Response(status=status.HTTP_200_OK)
 
+
+@method_decorator(csrf_exempt, name='dispatch')
+class UserExistsBatch(generics.GenericAPIView):
+    """
+    Check many usernames and emails at once.
+
+    Answers `{"usernames": {name: available}, "emails": {email: available}}`.
+    Most free names are answered from memory; the rest take a single query.
+    """
+    serializer_class = AvailabilitySerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(check_availability(**serializer.validated_data))
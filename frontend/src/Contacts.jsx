@@ -1,7 +1,6 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import Navbar from "./Navbar";
-import { fuzzySearch } from "./utility/fuzzySearch";
 
 const ContactsPage = () => {
   const [contacts, setContacts] = useState([]);
@@ -9,6 +8,7 @@ const ContactsPage = () => {
   const [error, setError] = useState("");
   const [showForm, setShowForm] = useState(false);
   const [query, setQuery] = useState("");
+  const [searchResults, setSearchResults] = useState(null);
   const [newContact, setNewContact] = useState({
     first_name: "",
     last_name: "",
@@ -16,26 +16,54 @@ const ContactsPage = () => {
     phone: "",
     notes: ""
   });
+  const syncToken = useRef("0");
   const navigate = useNavigate();
 
-  const fetchContacts = async () => {
+  const applyChanges = (current, changed, deleted) => {
+    const byId = new Map(current.map((contact) => [contact.id, contact]));
+    deleted.forEach((id) => byId.delete(id));
+    changed.forEach((contact) => byId.set(contact.id, contact));
+    return [...byId.values()].sort(
+      (a, b) => a.last_name.localeCompare(b.last_name) || a.id - b.id
+    );
+  };
+
+  // Keeps a local copy of the contacts and only fetches what changed since
+  // the last sync.
+  const syncContacts = async () => {
     try {
       const token = localStorage.getItem("token");
+      let more = true;
 
-      const response = await fetch("http://localhost:8000/api/contacts/", {
-        method: "GET",
-        headers: {
-          "Content-Type": "application/json",
-          Authorization: `Token ${token}`,
-        },
-      });
+      while (more) {
+        const params = new URLSearchParams({ since: syncToken.current });
+        const response = await fetch(`http://localhost:8000/api/contacts/changes/?${params}`, {
+          method: "GET",
+          headers: {
+            "Content-Type": "application/json",
+            Authorization: `Token ${token}`,
+          },
+        });
 
-      if (!response.ok) {
-        throw new Error("Failed to fetch contacts");
-      }
+        if (response.status === 410) {
+          // Too far behind: start over with a full sync.
+          syncToken.current = "0";
+          setContacts([]);
+          continue;
+        }
+        if (!response.ok) {
+          throw new Error("Failed to fetch contacts");
+        }
 
-      const data = await response.json();
-      setContacts(data);
+        const data = await response.json();
+        if (syncToken.current === "0") {
+          setContacts(applyChanges([], data.changed, data.deleted));
+        } else {
+          setContacts((current) => applyChanges(current, data.changed, data.deleted));
+        }
+        syncToken.current = data.sync_token;
+        more = data.more;
+      }
     } catch (err) {
       setError("Unable to load contacts.");
       console.error(err);
@@ -103,21 +131,57 @@ const ContactsPage = () => {
           Authorization: `Token ${token}`,
         },
       });
-      fetchContacts();
+      syncContacts();
     } catch (error) {
       console.error('Error deleting contact:', error);
     }
   };
 
-  const filteredContacts = contacts.filter(contact => {
-    const fullName = `${contact.first_name} ${contact.last_name}`.toLowerCase();
-    return fullName.includes(query.toLowerCase());
-  });
+  const searchContacts = async (q, signal) => {
+    try {
+      const token = localStorage.getItem("token");
+      const params = new URLSearchParams({ q });
+      const response = await fetch(`http://localhost:8000/api/contacts/search/?${params}`, {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Token ${token}`,
+        },
+        signal,
+      });
+
+      if (!response.ok) {
+        throw new Error("Failed to search contacts");
+      }
+
+      const data = await response.json();
+      setSearchResults(data.results);
+    } catch (err) {
+      if (err.name !== "AbortError") {
+        console.error(err);
+      }
+    }
+  };
+
+  const filteredContacts = searchResults ?? contacts;
 
   useEffect(() => {
-    fetchContacts();
+    syncContacts();
   }, []);
 
+  useEffect(() => {
+    if (!query.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    const controller = new AbortController();
+    const timeout = setTimeout(() => searchContacts(query, controller.signal), 200);
+    return () => {
+      clearTimeout(timeout);
+      controller.abort();
+    };
+  }, [query, contacts]);
+
   if (loading) {
     return <div>Loading contacts...</div>;
   }
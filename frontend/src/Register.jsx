@@ -13,15 +13,16 @@ const Register = () => {
 
   const checkUserExists = async () => {
     try {
-      const response = await fetch("http://localhost:8000/api/user/exists/", {
+      const response = await fetch("http://localhost:8000/api/user/exists/batch/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ username, email }),
+        body: JSON.stringify({ usernames: [username], emails: [email] }),
       });
+      const availability = await response.json();
 
-      if (response.status == 200) {
+      if (response.ok && availability.usernames[username] && availability.emails[email]) {
         setError("");
         return false;
       } else {
@@ -1,39 +0,0 @@
-const levenshteinDistance = (a, b) => {
-    const matrix = [];
-
-    for (let i = 0; i <= b.length; i++) {
-        matrix[i] = [i];
-    }
-    for (let j = 0; j <= a.length; j++) {
-        matrix[0][j] = j;
-    }
-
-    for (let i = 1; i <= b.length; i++) {
-        for (let j = 1; j <= a.length; j++) {
-            if (b.charAt(i - 1) === a.charAt(j - 1)) {
-                matrix[i][j] = matrix[i - 1][j - 1];
-            } else {
-                matrix[i][j] = Math.min(
-                    matrix[i - 1][j - 1] + 1,
-                    matrix[i][j - 1] + 1,
-                    matrix[i - 1][j] + 1
-                );
-            }
-        }
-    }
-
-    return matrix[b.length][a.length];
-};
-
-const fuzzySearch = (query, contacts) => {
-    const threshold = 10;
-    const results = contacts.filter(contact => {
-        const fullName = `${contact.first_name} ${contact.last_name}`.toLowerCase();
-        const distance = levenshteinDistance(query.toLowerCase(), fullName);
-        return distance <= threshold;
-    });
-
-    return results;
-};
-
-export { fuzzySearch };
\ No newline at end of file